@@ -0,0 +1,208 @@
+import csv
+import math
+import mmap
+import os
+from datetime import datetime, timedelta
+
+import InputData as D
+
+# names of the columns in the arrival logs
+# (only the arrival time is required, missing values in the other columns are sampled from the distributions)
+COL_ARRIVAL_TIME = 'arrival_time'   # check-in timestamp or hours since midnight of the first day of the log
+COL_EXAM_DURATION = 'exam_duration'     # duration of the PCP exam (hours)
+COL_MH_DURATION = 'mh_duration'         # duration of the mental health consultation (hours)
+COL_DEPRESSION = 'depression'           # if the patient was diagnosed with depression (1/0, true/false, yes/no)
+
+
+class LoggedVisit:
+    def __init__(self, time, exam_duration=None, mh_consult_duration=None, if_with_depression=None):
+        """ a patient visit read from the arrival log
+        :param time: (float) arrival time (hours since the opening of the day)
+        :param exam_duration: (float) duration of exam (hours) or None if not logged
+        :param mh_consult_duration: (float) duration of mental health consultation (hours) or None if not logged
+        :param if_with_depression: (bool) if the patient has depression or None if not logged
+        """
+        self.time = time
+        self.examDuration = exam_duration
+        self.mhConsultDuration = mh_consult_duration
+        self.ifWithDepression = if_with_depression
+
+
+class ArrivalLog:
+    def __init__(self, file_name, opening_hour=D.OPENING_HOUR, chunk_size=D.LOG_CHUNK_SIZE):
+        """ replays patient visits from a log of historical arrivals, one day at a time.
+        CSV logs are memory-mapped and parquet logs are read in batches of rows, so that
+        only the rows that are being replayed are held in memory.
+        A day starts at the opening hour (so visits after midnight belong to the day before) and the arrival
+        times of its visits are measured from its opening; next_day() moves to the next day of the log.
+        :param file_name: path to the log (.csv or .parquet)
+        :param opening_hour: clock hour the urgent care opens
+        :param chunk_size: number of rows to read at a time from parquet logs
+        """
+
+        self.fileName = file_name
+        self.openingHour = opening_hour
+        self.chunkSize = chunk_size
+        self.nVisitsRead = 0    # number of visits read so far
+        self.nDaysRead = 0      # number of days started so far
+        self.day = None         # the day being replayed (date for timestamps or number of days for hours)
+        self.ifExhausted = False    # if all visits of the log have been read
+        self.lastTime = None    # check-in time of the last visit read (to check the order of the visits)
+        self.nextVisit = None   # (day, visit) of the next visit (read ahead to find where a day ends)
+
+        if file_name.lower().endswith('.parquet'):
+            self.rows = self.__read_parquet()
+        elif file_name.lower().endswith('.csv'):
+            self.rows = self.__read_csv()
+        else:
+            raise ValueError('Arrival log should be a .csv or a .parquet file, but got ' + file_name + '.')
+
+    def next_day(self):
+        """ moves to the next day of the log (the visits not replayed on the current day are skipped)
+        :return: True if there is a day to replay and False if the log is exhausted
+        """
+
+        # skip the rest of the current day (e.g. visits after the urgent care closed)
+        while self.nextVisit is not None and self.nextVisit[0] == self.day:
+            self.nextVisit = self.__read_visit()
+
+        if self.nextVisit is None and not self.ifExhausted:
+            self.nextVisit = self.__read_visit()
+        if self.nextVisit is None:
+            return False
+
+        self.day = self.nextVisit[0]
+        self.nDaysRead += 1
+        return True
+
+    def get_next_visit(self):
+        """
+        :return: the next visit of the current day or None if there is no more visits on this day
+        """
+
+        if self.nextVisit is None or self.nextVisit[0] != self.day:
+            return None
+
+        visit = self.nextVisit[1]
+        self.nextVisit = self.__read_visit()
+        return visit
+
+    def close(self):
+        """ releases the file that is being read """
+
+        self.rows.close()
+
+    def __read_visit(self):
+        """
+        :return: (day, visit) of the next row of the log or None if the log is exhausted
+        """
+
+        row = next(self.rows, None)
+        if row is None:
+            self.ifExhausted = True
+            return None
+
+        check_in = _to_check_in(value=row.get(COL_ARRIVAL_TIME))
+        if check_in is None:
+            raise ValueError('Visit ' + str(self.nVisitsRead) + ' in ' + self.fileName + ' has no arrival time.')
+        if self.lastTime is not None and check_in < self.lastTime:
+            raise ValueError('Arrivals in ' + self.fileName + ' should be sorted by time, but visit '
+                             + str(self.nVisitsRead) + ' arrives before the previous one.')
+        self.lastTime = check_in
+        self.nVisitsRead += 1
+
+        day, time = self.__to_day_and_hours(check_in=check_in)
+        visit = LoggedVisit(time=time,
+                            exam_duration=_to_float(row.get(COL_EXAM_DURATION)),
+                            mh_consult_duration=_to_float(row.get(COL_MH_DURATION)),
+                            if_with_depression=_to_bool(row.get(COL_DEPRESSION)))
+        return day, visit
+
+    def __to_day_and_hours(self, check_in):
+        """
+        :param check_in: check-in timestamp or hours since midnight of the first day of the log
+        :return: (day, hours since the opening of that day)
+        """
+
+        if isinstance(check_in, datetime):
+            since_opening = check_in - timedelta(hours=self.openingHour)
+            day = since_opening.date()
+            midnight = datetime.combine(day, datetime.min.time(), tzinfo=since_opening.tzinfo)
+            return day, (since_opening - midnight).total_seconds() / 3600
+
+        since_opening = check_in - self.openingHour
+        day = math.floor(since_opening / 24)
+        return day, since_opening - 24 * day
+
+    def __read_csv(self):
+        """ yields the rows of a csv log as dictionaries keyed by the column names """
+
+        if os.path.getsize(self.fileName) == 0:
+            return
+
+        with open(self.fileName, 'rb') as file, mmap.mmap(file.fileno(), length=0, access=mmap.ACCESS_READ) as mm:
+            reader = csv.reader(line.decode('utf-8') for line in iter(mm.readline, b''))
+            header = [name.strip() for name in next(reader, [])]
+            _check_columns(header=header, file_name=self.fileName)
+            for values in reader:
+                if len(values) > 0:
+                    yield dict(zip(header, values))
+
+    def __read_parquet(self):
+        """ yields the rows of a parquet log as dictionaries keyed by the column names """
+
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is required to replay arrivals from parquet logs.')
+
+        parquet_file = pq.ParquetFile(self.fileName)
+        _check_columns(header=parquet_file.schema_arrow.names, file_name=self.fileName)
+        columns = [name for name in (COL_ARRIVAL_TIME, COL_EXAM_DURATION, COL_MH_DURATION, COL_DEPRESSION)
+                   if name in parquet_file.schema_arrow.names]
+
+        try:
+            for batch in parquet_file.iter_batches(batch_size=self.chunkSize, columns=columns):
+                yield from batch.to_pylist()
+        finally:
+            parquet_file.close()
+
+
+def _check_columns(header, file_name):
+    """ raises an error if the arrival time column is missing from the log """
+
+    if COL_ARRIVAL_TIME not in header:
+        raise ValueError('Arrival log ' + file_name + ' should have a column named ' + COL_ARRIVAL_TIME + '.')
+
+
+def _to_check_in(value):
+    """ :returns the check-in time as a timestamp or hours (None if the value is missing) """
+
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return datetime.fromisoformat(value)
+    return float(value)
+
+
+def _to_float(value):
+    """ :returns the value as float or None if the value is missing """
+
+    if value is None or value == '':
+        return None
+    return float(value)
+
+
+def _to_bool(value):
+    """ :returns the value as bool or None if the value is missing """
+
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y', 't')
+    return bool(value)
\ No newline at end of file
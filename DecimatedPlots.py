@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import InputData as D
+
+
+def decimate_sample_path(sample_path, max_points=D.MAX_PLOT_POINTS):
+    """ downsamples a sample path while keeping its minimum and maximum values over each interval of time
+    (min/max envelope, so peaks of queue lengths are not lost)
+    :param sample_path: a sample path (e.g. deampy.sample_path.PrevalenceSamplePath)
+    :param max_points: maximum number of points to keep
+    :return: (tuple) of arrays with the times and values of the downsampled sample path
+    """
+
+    times = np.asarray(sample_path.get_times(), dtype=float)
+    values = np.asarray(sample_path.get_values(), dtype=float)
+    if len(times) <= max_points:
+        return times, values
+
+    # divide the simulation time into equal intervals (up to 4 points are kept in each)
+    n_intervals = max(max_points // 4, 1)
+    intervals = np.minimum(((times - times[0]) / (times[-1] - times[0]) * n_intervals).astype(int), n_intervals - 1)
+    starts = np.flatnonzero(np.diff(intervals, prepend=-1))
+    ends = np.append(starts[1:], len(times))
+
+    # keep the first, the last, the minimum, and the maximum points of each interval (in the order of time)
+    kept = []
+    for start, end in zip(starts, ends):
+        segment = values[start:end]
+        kept.extend(sorted({start, start + int(np.argmin(segment)), start + int(np.argmax(segment)), end - 1}))
+
+    return times[kept], values[kept]
+
+
+def bin_histogram(data, n_bins=D.N_HISTOGRAM_BINS):
+    """
+    :param data: (list) observations
+    :param n_bins: number of bins
+    :return: (tuple) of arrays with the counts and the bin edges
+    """
+    return np.histogram(np.asarray(data, dtype=float), bins=n_bins)
+
+
+class SamplePathFigure:
+    def __init__(self, sample_path, title, x_label, file_name, y_label=None, max_points=D.MAX_PLOT_POINTS):
+        """ a figure of a sample path to render to a file (the sample path is downsampled when created)
+        :param sample_path: a sample path
+        :param title: (string) title of the figure
+        :param x_label: (string) x-axis label
+        :param file_name: (string) file to save the figure as (e.g. 'fig.png')
+        :param y_label: (string) y-axis label
+        :param max_points: maximum number of points to plot
+        """
+        self.times, self.values = decimate_sample_path(sample_path=sample_path, max_points=max_points)
+        self.title = title
+        self.xLabel = x_label
+        self.yLabel = y_label
+        self.fileName = file_name
+
+    def render(self):
+        """ renders the figure to its file """
+
+        fig, ax = _get_figure_and_ax()
+        ax.step(self.times, self.values, where='post')
+        ax.set_xlim(left=0)
+        ax.set_ylim(bottom=0)
+        _save_figure(fig=fig, ax=ax, title=self.title, x_label=self.xLabel, y_label=self.yLabel,
+                     file_name=self.fileName)
+
+
+class HistogramFigure:
+    def __init__(self, data, title, x_label, file_name, y_label=None, n_bins=D.N_HISTOGRAM_BINS):
+        """ a figure of a histogram to render to a file (the data is binned when created)
+        :param data: (list) observations
+        :param title: (string) title of the figure
+        :param x_label: (string) x-axis label
+        :param file_name: (string) file to save the figure as (e.g. 'fig.png')
+        :param y_label: (string) y-axis label
+        :param n_bins: number of bins
+        """
+        self.counts, self.edges = bin_histogram(data=data, n_bins=n_bins)
+        self.title = title
+        self.xLabel = x_label
+        self.yLabel = y_label
+        self.fileName = file_name
+
+    def render(self):
+        """ renders the figure to its file """
+
+        fig, ax = _get_figure_and_ax()
+        ax.stairs(self.counts, self.edges, fill=True, edgecolor='black')
+        _save_figure(fig=fig, ax=ax, title=self.title, x_label=self.xLabel, y_label=self.yLabel,
+                     file_name=self.fileName)
+
+
+def render_figures(figures, n_processes=None):
+    """ renders figures to their files in parallel processes
+    :param figures: (list) of figures (e.g. SamplePathFigure and HistogramFigure)
+    :param n_processes: number of processes (number of CPUs by default)
+    """
+
+    with ProcessPoolExecutor(max_workers=n_processes) as executor:
+        # iterate over the results to raise the errors that occurred in rendering
+        for result in executor.map(_render, figures):
+            pass
+
+
+def _render(figure):
+    """ renders a figure (in a worker process) """
+    figure.render()
+
+
+def _get_figure_and_ax():
+    """ :returns a new figure and its axis (drawn without a display) """
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    return plt.subplots()
+
+
+def _save_figure(fig, ax, title, x_label, y_label, file_name):
+    """ labels the figure, saves it to the file, and closes it """
+
+    import matplotlib.pyplot as plt
+
+    ax.set_title(title)
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+
+    directory = os.path.dirname(file_name)
+    if directory != '':
+        os.makedirs(directory, exist_ok=True)
+    fig.savefig(file_name, dpi=300, bbox_inches='tight')
+    plt.close(fig)
\ No newline at end of file
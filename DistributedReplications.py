@@ -0,0 +1,373 @@
+import os
+import pickle
+import socket
+import sys
+import time
+import traceback
+import uuid
+
+import InputData as D
+from ModelOutputs import TimeBucketStats
+from UrgentCareModel import UrgentCareModel
+
+
+class WorkUnit:
+    def __init__(self, id, parameters, first_seed, n_seeds, sim_duration):
+        """ a range of replications to simulate with the same parameters
+        :param id: (string) ID of this work unit
+        :param parameters: parameters of the urgent care model
+        :param first_seed: seed (replication ID) of the first replication
+        :param n_seeds: number of replications
+        :param sim_duration: duration of simulation (hours)
+        """
+        self.id = id
+        self.params = parameters
+        self.firstSeed = first_seed
+        self.nSeeds = n_seeds
+        self.simDuration = sim_duration
+        self.attempt = 1    # number of times this unit has been handed out to be simulated (after errors)
+
+    def simulate(self):
+        """
+        :return: (list) of summaries of the replications of this work unit
+        """
+
+        summaries = []
+        for seed in range(self.firstSeed, self.firstSeed + self.nSeeds):
+            model = UrgentCareModel(id=seed, parameters=self.params)
+            model.simulate(sim_duration=self.simDuration)
+            summaries.append(ReplicationSummary(seed=seed, sim_outputs=model.simOutputs))
+
+        return summaries
+
+
+class ReplicationSummary:
+    def __init__(self, seed, sim_outputs):
+        """ compact summary of the outputs of a replication (to send back from workers)
+        :param seed: seed (replication ID) of the replication
+        :param sim_outputs: simulation outputs of the replication
+        """
+        self.seed = seed
+        self.nPatientsArrived = sim_outputs.nPatientsArrived
+        self.nPatientsServed = sim_outputs.nPatientsServed
+        self.aveTimeInSystem = sim_outputs.get_ave_patient_time_in_system()
+        self.aveWaitingTime = sim_outputs.get_ave_patient_waiting_time()
+        self.aveMHWaitingTime = sim_outputs.get_ave_patient_mh_waiting_time()
+        self.bucketStats = sim_outputs.bucketStats     # (released once merged by the coordinator)
+
+
+class WorkFailure:
+    def __init__(self, unit, worker_id, error):
+        """ an error raised while a worker simulated a work unit
+        :param unit: the work unit
+        :param worker_id: (string) ID of the worker
+        :param error: (string) traceback of the error
+        """
+        self.unitId = unit.id
+        self.attempt = unit.attempt
+        self.workerId = worker_id
+        self.error = error
+
+
+class WorkQueue:
+    # interface of the queues that hand out work units to workers
+    # (derived classes implement the transport, e.g. a shared directory or a message broker)
+
+    def put(self, unit):
+        """ adds a work unit to the queue
+        :param unit: a work unit
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def lease(self, worker_id):
+        """ hands out a pending work unit to a worker (until it is completed or the lease expires)
+        :param worker_id: (string) ID of the worker
+        :return: a work unit or None if no work unit is pending
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def complete(self, unit, summaries):
+        """ stores the results of a work unit
+        :param unit: the completed work unit
+        :param summaries: (list) of replication summaries
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def fail(self, unit, failure):
+        """ stores the error raised while simulating a work unit (and releases its lease)
+        :param unit: the work unit that failed
+        :param failure: the failure (WorkFailure)
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def requeue_expired(self):
+        """ makes the work units whose lease has expired without results pending again
+        :return: number of work units requeued
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def get_results(self, unit_ids):
+        """
+        :param unit_ids: (list) IDs of work units
+        :return: (dictionary) replication summaries keyed by the IDs of the completed work units
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def get_failures(self, unit_ids):
+        """
+        :param unit_ids: (list) IDs of work units
+        :return: (dictionary) the last failure (WorkFailure) keyed by the IDs of the work units that failed
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+    def remove(self, unit_ids):
+        """ removes work units with their results and failures from the queue (once the results are collected)
+        :param unit_ids: (list) IDs of work units
+        """
+        raise NotImplementedError("This is an abstract method and needs to be implemented in derived classes.")
+
+
+class FileWorkQueue(WorkQueue):
+    def __init__(self, directory, lease_time=D.LEASE_TIME):
+        """ a work queue in a directory shared by the coordinator and the workers
+        (work units are leased by atomically renaming their files, so no lock is needed)
+        :param directory: path to the shared directory
+        :param lease_time: (seconds) a leased work unit without results is requeued after this time
+        """
+
+        self.leaseTime = lease_time
+        self.pendingDir = os.path.join(directory, 'pending')
+        self.leasedDir = os.path.join(directory, 'leased')
+        self.resultsDir = os.path.join(directory, 'results')
+        self.failuresDir = os.path.join(directory, 'failures')
+        for folder in (self.pendingDir, self.leasedDir, self.resultsDir, self.failuresDir):
+            os.makedirs(folder, exist_ok=True)
+
+    def put(self, unit):
+        _write_pickle(path=os.path.join(self.pendingDir, unit.id + '.pkl'), obj=unit)
+
+    def lease(self, worker_id):
+        for file_name in sorted(os.listdir(self.pendingDir)):
+            if not file_name.endswith('.pkl'):
+                continue
+            pending_path = os.path.join(self.pendingDir, file_name)
+            leased_path = os.path.join(self.leasedDir, file_name)
+            try:
+                # the modification time of the leased file marks the start of the lease
+                # (stamped before the rename so the unit is never leased with the time it was put in the queue)
+                os.utime(pending_path)
+                os.rename(pending_path, leased_path)
+                with open(leased_path, 'rb') as file:
+                    return pickle.load(file)
+            except FileNotFoundError:
+                # another worker leased this unit first (or the unit was removed)
+                continue
+        return None
+
+    def complete(self, unit, summaries):
+        _write_pickle(path=os.path.join(self.resultsDir, unit.id + '.pkl'), obj=summaries)
+        try:
+            os.remove(os.path.join(self.leasedDir, unit.id + '.pkl'))
+        except FileNotFoundError:
+            # the lease expired and the unit was requeued (or completed by another worker)
+            pass
+
+    def fail(self, unit, failure):
+        # the last failure of each unit is kept (the coordinator hands out a unit again only after its failure)
+        _write_pickle(path=os.path.join(self.failuresDir, unit.id + '.pkl'), obj=failure)
+        try:
+            os.remove(os.path.join(self.leasedDir, unit.id + '.pkl'))
+        except FileNotFoundError:
+            pass
+
+    def requeue_expired(self):
+        n_requeued = 0
+        now = time.time()
+        for file_name in os.listdir(self.leasedDir):
+            leased_path = os.path.join(self.leasedDir, file_name)
+            try:
+                if now - os.path.getmtime(leased_path) < self.leaseTime:
+                    continue
+                if os.path.exists(os.path.join(self.resultsDir, file_name)):
+                    os.remove(leased_path)
+                else:
+                    os.rename(leased_path, os.path.join(self.pendingDir, file_name))
+                    n_requeued += 1
+            except FileNotFoundError:
+                # the unit was completed in the meantime
+                continue
+        return n_requeued
+
+    def get_results(self, unit_ids):
+        return _read_pickles(directory=self.resultsDir, unit_ids=unit_ids)
+
+    def get_failures(self, unit_ids):
+        return _read_pickles(directory=self.failuresDir, unit_ids=unit_ids)
+
+    def remove(self, unit_ids):
+        for unit_id in unit_ids:
+            for folder in (self.pendingDir, self.leasedDir, self.resultsDir, self.failuresDir):
+                try:
+                    os.remove(os.path.join(folder, unit_id + '.pkl'))
+                except FileNotFoundError:
+                    pass
+
+
+class DistributedMultiUrgentCareModel:
+    def __init__(self, ids, parameters, queue):
+        """ simulates replications of the urgent care model on the workers serving a work queue
+        (the outputs are the same as MultiUrgentCareModel no matter which worker simulates which replication)
+        :param ids: (list) IDs of the replications (also used as random seeds)
+        :param parameters: parameters of the urgent care model
+        :param queue: the work queue (e.g. FileWorkQueue)
+        """
+
+        self.ids = list(ids)
+        self.params = parameters
+        self.queue = queue
+
+        self.summaries = []             # summaries of replications (ordered by replication ID)
+        self.aveTimeInSystem = []       # average patient time in system of each replication
+        self.aveWaitingTime = []        # average patient waiting time for PCP of each replication
+        self.aveMHWaitingTime = []      # average patient waiting time for MHS of each replication
+        self.bucketStats = TimeBucketStats()    # time-bucketed metrics merged across replications
+
+    def simulate(self, sim_duration, unit_size=D.WORK_UNIT_SIZE, poll_interval=D.POLL_INTERVAL, timeout=None,
+                 max_attempts=D.MAX_ATTEMPTS):
+        """ hands out the replications to the workers and collects the results
+        :param sim_duration: duration of simulation (hours)
+        :param unit_size: number of replications in each work unit
+        :param poll_interval: (seconds) time between checks for results and expired leases
+        :param timeout: (seconds) maximum time to wait for the results (None to wait until all are received)
+        :param max_attempts: a work unit that raises an error is handed out again until it has failed this many times
+        :raises RuntimeError: if a work unit fails max_attempts times (with the traceback of its last error)
+        """
+
+        # create the work units (consecutive ranges of replication IDs)
+        job_id = uuid.uuid4().hex
+        units = []
+        ids = sorted(self.ids)
+        i = 0
+        while i < len(ids):
+            # extend the unit while the IDs are consecutive
+            j = i + 1
+            while j < len(ids) and j - i < unit_size and ids[j] == ids[j - 1] + 1:
+                j += 1
+            units.append(WorkUnit(id=job_id + '-' + str(len(units)), parameters=self.params,
+                                  first_seed=ids[i], n_seeds=j - i, sim_duration=sim_duration))
+            i = j
+
+        for unit in units:
+            self.queue.put(unit)
+
+        # wait for the results, requeueing the units that are lost or failed
+        # (the units of this job are removed from the queue once done, even if the job fails)
+        try:
+            results = self.__wait_for_results(units=units, poll_interval=poll_interval, timeout=timeout,
+                                              max_attempts=max_attempts)
+        finally:
+            self.queue.remove(unit_ids=[unit.id for unit in units])
+
+        # order the summaries by replication ID so the outputs do not depend on the workers
+        summaries = {}
+        for unit_summaries in results.values():
+            for summary in unit_summaries:
+                summaries[summary.seed] = summary
+        self.summaries = [summaries[id] for id in self.ids]
+
+        self.aveTimeInSystem = [s.aveTimeInSystem for s in self.summaries]
+        self.aveWaitingTime = [s.aveWaitingTime for s in self.summaries]
+        self.aveMHWaitingTime = [s.aveMHWaitingTime for s in self.summaries]
+        for summary in self.summaries:
+            self.bucketStats.merge(summary.bucketStats)
+            summary.bucketStats = None
+
+    def __wait_for_results(self, units, poll_interval, timeout, max_attempts):
+        """
+        :return: (dictionary) replication summaries keyed by the IDs of the work units
+        """
+
+        units_by_id = {unit.id: unit for unit in units}
+        start = time.time()
+        results = {}
+        while True:
+            results.update(self.queue.get_results(unit_ids=[u for u in units_by_id if u not in results]))
+            if len(results) == len(units):
+                return results
+
+            failures = self.queue.get_failures(unit_ids=[u for u in units_by_id if u not in results])
+            for unit_id, failure in failures.items():
+                unit = units_by_id[unit_id]
+                if failure.attempt >= max_attempts:
+                    raise RuntimeError('Work unit ' + unit_id + ' (replications ' + str(unit.firstSeed) + ' to '
+                                       + str(unit.firstSeed + unit.nSeeds - 1) + ') failed ' + str(max_attempts)
+                                       + ' times. The last error on worker ' + failure.workerId + ':\n'
+                                       + failure.error)
+                # hand out the unit again (once for each failed attempt)
+                if failure.attempt == unit.attempt:
+                    unit.attempt += 1
+                    self.queue.put(unit)
+
+            if timeout is not None and time.time() - start > timeout:
+                raise TimeoutError(str(len(units) - len(results)) + ' of ' + str(len(units))
+                                   + ' work units did not complete within the timeout.')
+            self.queue.requeue_expired()
+            time.sleep(poll_interval)
+
+
+def run_worker(queue, worker_id=None, poll_interval=D.POLL_INTERVAL, if_stop_when_idle=False):
+    """ simulates the work units handed out by the queue
+    :param queue: the work queue (e.g. FileWorkQueue)
+    :param worker_id: (string) ID of this worker (host name and process ID by default)
+    :param poll_interval: (seconds) time to wait when no work unit is pending
+    :param if_stop_when_idle: set to True to return once no work unit is pending
+    :return: number of work units completed
+    """
+
+    if worker_id is None:
+        worker_id = socket.gethostname() + '-' + str(os.getpid())
+
+    n_completed = 0
+    while True:
+        unit = queue.lease(worker_id=worker_id)
+        if unit is None:
+            if if_stop_when_idle:
+                return n_completed
+            time.sleep(poll_interval)
+            continue
+
+        # errors are reported to the coordinator (which hands out the unit again or stops) and the worker goes on
+        try:
+            summaries = unit.simulate()
+        except Exception:
+            queue.fail(unit=unit, failure=WorkFailure(unit=unit, worker_id=worker_id, error=traceback.format_exc()))
+            continue
+
+        queue.complete(unit=unit, summaries=summaries)
+        n_completed += 1
+
+
+def _read_pickles(directory, unit_ids):
+    """ :returns (dictionary) the objects stored for the work units keyed by the IDs of the units that have one """
+
+    objects = {}
+    for unit_id in unit_ids:
+        path = os.path.join(directory, unit_id + '.pkl')
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                objects[unit_id] = pickle.load(file)
+    return objects
+
+
+def _write_pickle(path, obj):
+    """ writes the object to a file atomically (readers never see a partially written file) """
+
+    temp_path = path + '.' + uuid.uuid4().hex + '.tmp'
+    with open(temp_path, 'wb') as file:
+        pickle.dump(obj, file)
+    os.replace(temp_path, path)
+
+
+if __name__ == '__main__':
+    # run a worker on this host: python DistributedReplications.py <shared queue directory>
+    run_worker(queue=FileWorkQueue(directory=sys.argv[1]))
\ No newline at end of file
@@ -0,0 +1,113 @@
+import copy
+
+from deampy.statistics import SummaryStat
+
+import InputData as D
+from UrgentCareModel import UrgentCareModel
+
+# parameters (means of the exponential distributions) the derivatives are estimated with respect to
+MEAN_ARRIVAL_TIME = 'meanArrivalTime'
+MEAN_EXAM_DURATION = 'meanExamDuration'
+MEAN_MH_CONSULT = 'meanMHConsult'
+
+# outputs the derivatives are estimated for
+TIME_IN_SYSTEM = 'aveTimeInSystem'
+WAITING_TIME = 'aveWaitingTime'
+MH_WAITING_TIME = 'aveMHWaitingTime'
+
+
+class ScoredExponential:
+    def __init__(self, dist):
+        """ samples from an exponential distribution (exactly as the original distribution does)
+        and accumulates the score, the derivative of the log likelihood of the samples with respect to the mean
+        :param dist: the original exponential distribution (deampy.random_variates.Exponential)
+        """
+        self.scale = dist.scale
+        self.loc = dist.loc
+        self.score = 0
+
+    def sample(self, rng, arg=None):
+        """
+        :param rng: random number generator
+        :return: a sample from the distribution
+        """
+
+        x = rng.exponential(scale=self.scale)
+
+        # d/d(scale) of log f(x) = -1/scale + x/scale^2
+        self.score += (x - self.scale) / self.scale ** 2
+
+        return x + self.loc
+
+
+class LikelihoodRatioGradient:
+    def __init__(self, ids, parameters):
+        """ estimates the derivatives of the average time in system and waiting times with respect to
+        the mean inter-arrival time, the mean exam duration, and the mean MH consultation duration
+        from the same replications that estimate the outputs (likelihood ratio / score function method).
+        The derivative of E[Y] with respect to a mean is E[Y * S] where S is the score of all samples
+        drawn from that distribution in a replication; (Y - average of Y) is used in place of Y to reduce the
+        variance (since E[S] = 0). The variance grows with the number of samples drawn in a replication.
+        :param ids: (list) IDs of the replications (also used as random seeds)
+        :param parameters: parameters of the urgent care model (with exponential distributions)
+        """
+
+        if parameters.arrivalLog is not None:
+            raise ValueError('Derivatives cannot be estimated when arrivals are replayed from a log.')
+
+        self.ids = ids
+        self.params = parameters
+
+        # outputs of each replication (the same as MultiUrgentCareModel)
+        self.outputs = {TIME_IN_SYSTEM: [], WAITING_TIME: [], MH_WAITING_TIME: []}
+        # score of each replication with respect to each parameter
+        self.scores = {MEAN_ARRIVAL_TIME: [], MEAN_EXAM_DURATION: [], MEAN_MH_CONSULT: []}
+
+    def simulate(self, sim_duration=D.SIM_DURATION):
+        """ simulate all replications
+        :param sim_duration: duration of simulation (hours)
+        """
+
+        for id in self.ids:
+            # parameters with the distributions that accumulate the scores of this replication
+            params = copy.copy(self.params)
+            params.arrivalTimeDist = ScoredExponential(dist=self.params.arrivalTimeDist)
+            params.examTimeDist = ScoredExponential(dist=self.params.examTimeDist)
+            params.mentalHealthConsultDist = ScoredExponential(dist=self.params.mentalHealthConsultDist)
+
+            model = UrgentCareModel(id=id, parameters=params)
+            model.simulate(sim_duration=sim_duration)
+
+            # collect the outputs and the scores of this replication
+            self.outputs[TIME_IN_SYSTEM].append(model.simOutputs.get_ave_patient_time_in_system())
+            self.outputs[WAITING_TIME].append(model.simOutputs.get_ave_patient_waiting_time())
+            self.outputs[MH_WAITING_TIME].append(model.simOutputs.get_ave_patient_mh_waiting_time())
+            self.scores[MEAN_ARRIVAL_TIME].append(params.arrivalTimeDist.score)
+            self.scores[MEAN_EXAM_DURATION].append(params.examTimeDist.score)
+            self.scores[MEAN_MH_CONSULT].append(params.mentalHealthConsultDist.score)
+
+    def get_derivative(self, output, parameter):
+        """
+        :param output: TIME_IN_SYSTEM, WAITING_TIME, or MH_WAITING_TIME
+        :param parameter: MEAN_ARRIVAL_TIME, MEAN_EXAM_DURATION, or MEAN_MH_CONSULT
+        :return: estimated derivative of the mean of the output with respect to the parameter
+        """
+        return self.__get_stat(output=output, parameter=parameter).get_mean()
+
+    def get_derivative_CI(self, output, parameter, alpha=0.05):
+        """
+        :param output: TIME_IN_SYSTEM, WAITING_TIME, or MH_WAITING_TIME
+        :param parameter: MEAN_ARRIVAL_TIME, MEAN_EXAM_DURATION, or MEAN_MH_CONSULT
+        :param alpha: significance level
+        :return: t-based confidence interval of the derivative
+        """
+        return self.__get_stat(output=output, parameter=parameter).get_t_CI(alpha=alpha)
+
+    def __get_stat(self, output, parameter):
+        """ :returns summary statistics of the derivative observations of the replications """
+
+        outputs = self.outputs[output]
+        ave_output = sum(outputs) / len(outputs)
+        obs = [(y - ave_output) * s for y, s in zip(outputs, self.scores[parameter])]
+
+        return SummaryStat(name='d ' + output + ' / d ' + parameter, data=obs)
\ No newline at end of file
@@ -4,8 +4,33 @@ DECI = 5                # the decimal point to round the numbers to in the trace
 SIM_DURATION = 100000   # (hours) a large number to me sure the simulation will be terminated eventually but
 
 HOURS_OPEN = 20         # hours the urgent cares open
+OPENING_HOUR = 8        # clock hour the urgent care opens (days of arrival logs start at this hour)
 N_PCP = 10                # number of primary-care physicians
 MEAN_ARRIVAL_TIME = 1/60       # mean patients inter-arrival time (hours)
 MEAN_EXAM_DURATION = 10/60       # mean of exam duration (hours)
 MEAN_MH_CONSULT = 20/60         # mean duration of mental health consultation
 PROB_DEPRESSION = 0.1           # probability that a patient is diagnosed with depression
+MEAN_PCP_PATIENCE = None        # mean time patients wait for PCP before leaving (hours), None if they do not leave
+MEAN_MH_PATIENCE = None         # mean time patients wait for MHS before leaving (hours), None if they do not leave
+MAX_PCP_QUEUE = None            # arriving patients leave if this many patients are waiting for PCP (None for no limit)
+
+# trace-driven simulation
+ARRIVAL_LOG = None      # path to a .csv or .parquet log of historical arrivals to replay (None to sample arrivals)
+                        # (a replication replays one day; LoggedDaysUrgentCareModel replays all days)
+LOG_CHUNK_SIZE = 65536  # number of rows to read at a time from parquet logs
+
+# time-bucketed operational metrics
+BUCKET_WIDTH = 1        # (hours) width of the time buckets (from the opening until the end of the run)
+WAIT_BIN_WIDTH = 1/60   # (hours) width of the bins of the waiting time histograms used for percentiles
+MAX_WAIT = 12           # (hours) waiting times above this value are counted in the last bin
+
+
+# distributed replications
+WORK_UNIT_SIZE = 10     # number of replications in each work unit handed out to workers
+LEASE_TIME = 600        # (seconds) a work unit without results is handed out again after this time
+POLL_INTERVAL = 1       # (seconds) time between checks of the work queue
+MAX_ATTEMPTS = 3        # number of times a work unit is simulated before its errors stop the replications
+
+# figures
+MAX_PLOT_POINTS = 4000  # maximum number of points to plot for a sample path
+N_HISTOGRAM_BINS = 50   # number of bins of histograms
\ No newline at end of file
@@ -0,0 +1,183 @@
+import warnings
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.stats import norm
+
+import InputData as D
+from ModelParameters import Parameters
+from UrgentCareModel import MultiUrgentCareModel
+
+
+def simulate_design_points(design_points, n_replications, sim_duration=D.SIM_DURATION):
+    """ simulates the urgent care at each design point
+    :param design_points: (list) of dictionaries of parameter values keyed by the arguments of
+        ModelParameters.Parameters (e.g. {'n_pcps': 7, 'prob_depression': 0.14})
+    :param n_replications: number of replications at each design point
+    :param sim_duration: duration of simulation (hours)
+    :return: (list) of simulated MultiUrgentCareModel (one for each design point)
+    """
+
+    multi_models = []
+    for i, design in enumerate(design_points):
+        # design points are simulated with disjoint seeds, so the simulation noise is
+        # independent across design points (as StochasticKriging assumes)
+        multi_model = MultiUrgentCareModel(ids=range(i * n_replications, (i + 1) * n_replications),
+                                           parameters=Parameters(**design))
+        multi_model.simulate(sim_duration=sim_duration)
+        multi_models.append(multi_model)
+
+    return multi_models
+
+
+class StochasticKriging:
+    def __init__(self, factors):
+        """ a Gaussian process metamodel of a simulation output that accounts for the simulation noise
+        at each design point (stochastic kriging with a constant trend and a Gaussian covariance function)
+        :param factors: (list) names of the parameters the metamodel depends on
+            (arguments of ModelParameters.Parameters, e.g. ['n_pcps', 'prob_depression'])
+        """
+
+        self.factors = factors
+        self.lower = None       # lower bounds of the factors in the design
+        self.range = None       # ranges of the factors in the design (to scale the factors to [0, 1])
+        self.x = None           # scaled design points
+        self.y = None           # mean of the simulation outputs at design points
+        self.noiseVar = None    # variance of the mean of the simulation outputs at design points
+
+        self.beta = None        # constant trend
+        self.tau2 = None        # variance of the Gaussian process
+        self.theta = None       # sensitivity of the correlation to the distance along each factor
+        self.cholesky = None    # Cholesky factorization of the covariance matrix of the outputs
+        self.weights = None     # covariance matrix inverse times (y - beta)
+        self.sigmaInvOnes = None    # covariance matrix inverse times a vector of ones
+        self.onesSigmaInvOnes = None
+
+    def fit(self, design_points, observations):
+        """ fits the metamodel to the simulation outputs
+        :param design_points: (list) of dictionaries of parameter values (with keys in factors)
+        :param observations: (list) of lists of simulation outputs (one list of replication outputs
+            for each design point, e.g. MultiUrgentCareModel.aveTimeInSystem; at least 2 replications each;
+            the replications at different design points should use different seeds, as in simulate_design_points;
+            nan outputs, e.g. the MH waiting time when no patient saw the MHS, are left out, and so are the
+            design points with fewer than 2 replications with outputs)
+        """
+
+        observations = [np.asarray(obs, dtype=float) for obs in observations]
+        observations = [obs[~np.isnan(obs)] for obs in observations]
+        kept = [i for i, obs in enumerate(observations) if len(obs) >= 2]
+        if len(kept) == 0:
+            raise ValueError('At least 2 replications are needed at each design point to estimate the noise.')
+        if len(kept) < len(observations):
+            warnings.warn(str(len(observations) - len(kept)) + ' design points with fewer than 2 replications '
+                          'with outputs are left out of the metamodel.')
+        design_points = [design_points[i] for i in kept]
+        observations = [observations[i] for i in kept]
+
+        x = self.__to_array(design_points)
+        self.lower = x.min(axis=0)
+        self.range = x.max(axis=0) - self.lower
+        self.range[self.range == 0] = 1
+        self.x = (x - self.lower) / self.range
+
+        self.y = np.array([np.mean(obs) for obs in observations])
+        self.noiseVar = np.array([np.var(obs, ddof=1) / len(obs) for obs in observations])
+
+        # find the parameters of the Gaussian process that maximize the likelihood
+        # (log transformed, starting from a few initial correlation lengths)
+        y_var = max(np.var(self.y), 1e-12)
+        best = None
+        for log_theta0 in (-1, 1, 3):
+            x0 = np.append(np.log(y_var), np.full(len(self.factors), log_theta0))
+            result = minimize(self.__neg_log_likelihood, x0=x0, method='L-BFGS-B',
+                              bounds=[(np.log(y_var) - 10, np.log(y_var) + 10)] + [(-8, 8)] * len(self.factors))
+            if best is None or result.fun < best.fun:
+                best = result
+
+        self.tau2 = np.exp(best.x[0])
+        self.theta = np.exp(best.x[1:])
+
+        # store what predictions need
+        self.cholesky = cho_factor(self.__get_covariance(tau2=self.tau2, theta=self.theta), lower=True)
+        ones = np.ones(len(self.y))
+        self.sigmaInvOnes = self.__solve(ones)
+        self.onesSigmaInvOnes = ones @ self.sigmaInvOnes
+        self.beta = (self.sigmaInvOnes @ self.y) / self.onesSigmaInvOnes
+        self.weights = self.__solve(self.y - self.beta)
+
+    def predict(self, design_points):
+        """
+        :param design_points: (list) of dictionaries of parameter values (with keys in factors)
+        :return: (tuple) of arrays with the predicted mean and the standard deviation of the prediction
+        """
+
+        x = (self.__to_array(design_points) - self.lower) / self.range
+        r = self.tau2 * self.__get_correlation(x, self.x, self.theta)
+
+        mean = self.beta + r @ self.weights
+
+        # mean squared error of the prediction (including the error in estimating the trend)
+        sigma_inv_r = self.__solve(r.T)
+        eta = 1 - self.sigmaInvOnes @ r.T
+        mse = self.tau2 - np.sum(r.T * sigma_inv_r, axis=0) + eta ** 2 / self.onesSigmaInvOnes
+
+        return mean, np.sqrt(np.maximum(mse, 0))
+
+    def get_prediction_intervals(self, design_points, alpha=0.05):
+        """
+        :param design_points: (list) of dictionaries of parameter values (with keys in factors)
+        :param alpha: significance level
+        :return: (list) of [lower, upper] prediction intervals of the mean output
+        """
+
+        mean, st_dev = self.predict(design_points)
+        z = norm.ppf(1 - alpha / 2)
+        return [[m - z * s, m + z * s] for m, s in zip(mean, st_dev)]
+
+    def suggest_design_points(self, candidates, n=1):
+        """
+        :param candidates: (list) of dictionaries of parameter values to choose from
+        :param n: number of design points to suggest
+        :return: (list) the n candidates where the prediction is the most uncertain
+            (where new simulations would reduce the error the most)
+        """
+
+        mean, st_dev = self.predict(candidates)
+        order = np.argsort(-st_dev)
+        return [candidates[i] for i in order[:n]]
+
+    def __to_array(self, design_points):
+        """ :returns the values of the factors at design points as a 2-dimensional array """
+        return np.array([[design[factor] for factor in self.factors] for design in design_points], dtype=float)
+
+    def __get_correlation(self, x1, x2, theta):
+        """ :returns the Gaussian correlation between the rows of x1 and the rows of x2 """
+        sq_distances = ((x1[:, np.newaxis, :] - x2[np.newaxis, :, :]) ** 2) @ theta
+        return np.exp(-sq_distances)
+
+    def __get_covariance(self, tau2, theta):
+        """ :returns covariance matrix of the outputs at design points (Gaussian process + simulation noise) """
+        return tau2 * self.__get_correlation(self.x, self.x, theta) + np.diag(self.noiseVar) \
+            + 1e-10 * tau2 * np.eye(len(self.y))
+
+    def __solve(self, b):
+        """ :returns the covariance matrix inverse times b """
+        return cho_solve(self.cholesky, b)
+
+    def __neg_log_likelihood(self, log_params):
+        """ :returns negative log likelihood of the outputs at design points (up to a constant) """
+
+        tau2 = np.exp(log_params[0])
+        theta = np.exp(log_params[1:])
+        try:
+            cholesky = cho_factor(self.__get_covariance(tau2=tau2, theta=theta), lower=True)
+        except np.linalg.LinAlgError:
+            return np.inf
+
+        ones = np.ones(len(self.y))
+        sigma_inv_ones = cho_solve(cholesky, ones)
+        beta = (sigma_inv_ones @ self.y) / (ones @ sigma_inv_ones)
+        residuals = self.y - beta
+
+        return np.sum(np.log(np.diag(cholesky[0]))) + 0.5 * residuals @ cho_solve(cholesky, residuals)
\ No newline at end of file
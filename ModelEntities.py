@@ -1,7 +1,15 @@
-from ModelEvents import Arrival, EndOfExam, EndOfMentalHealthConsult
+import warnings
+from collections import OrderedDict
+
+from ArrivalLog import ArrivalLog
+from ModelEvents import Arrival, EndOfExam, EndOfMentalHealthConsult, Renege
 
 
 class Patient:
+    # attributes are stored in slots (no per-patient __dict__)
+    __slots__ = ('id', 'ifWithDepression', 'tArrived', 'tJoinedPCPWaitingRoom', 'tLeftPCPWaitingRoom',
+                 'tJoinedMHWaitingRoom', 'tLeftMHWaitingRoom', 'examDuration', 'mhConsultDuration', 'renegeEvent')
+
     def __init__(self, id, if_with_depression):
         """ create a patient
         :param id: (integer) patient ID
@@ -9,10 +17,14 @@ class Patient:
         """
         self.id = id
         self.ifWithDepression = if_with_depression
+        self.tArrived = None
         self.tJoinedPCPWaitingRoom = None
         self.tLeftPCPWaitingRoom = None
         self.tJoinedMHWaitingRoom = None
         self.tLeftMHWaitingRoom = None
+        self.examDuration = None        # duration of exam if known in advance (e.g. replayed from a log)
+        self.mhConsultDuration = None   # duration of mental health consultation if known in advance
+        self.renegeEvent = None         # scheduled event of leaving the waiting room if the patient runs out of patience
 
     def __str__(self):
         return "Patient " + str(self.id)
@@ -24,7 +36,7 @@ class PCPWaitingRoom:
         :param sim_out: simulation output
         :param trace: simulation trace
         """
-        self.patientsWaiting = []   # list of patients in the waiting room
+        self.patientsWaiting = OrderedDict()   # patients in the waiting room keyed by ID (in the order they joined)
         self.simOut = sim_out
         self.trace = trace
 
@@ -36,8 +48,8 @@ class PCPWaitingRoom:
         # update statistics for the patient who joins the waiting room
         self.simOut.collect_patient_joining_pcp_waiting_room(patient=patient)
 
-        # add the patient to the list of patients waiting
-        self.patientsWaiting.append(patient)
+        # add the patient to the patients waiting
+        self.patientsWaiting[patient.id] = patient
 
         # trace
         self.trace.add_message(
@@ -48,16 +60,34 @@ class PCPWaitingRoom:
         :returns: the next patient in line
         """
 
+        # pop the patient
+        patient = self.patientsWaiting.popitem(last=False)[1]
+        _cancel_renege(patient=patient)
+
         # update statistics for the patient who leaves the waiting room
-        self.simOut.collect_patient_leaving_pcp_waiting_room(patient=self.patientsWaiting[0])
+        self.simOut.collect_patient_leaving_pcp_waiting_room(patient=patient)
 
         # trace
         self.trace.add_message(
-            str(self.patientsWaiting[0]) + ' leaves the waiting room. Number waiting = '
-            + str(len(self.patientsWaiting) - 1) + '.')
+            str(patient) + ' leaves the waiting room. Number waiting = ' + str(len(self.patientsWaiting)) + '.')
 
-        # pop the patient
-        return self.patientsWaiting.pop(0)
+        return patient
+
+    def remove_patient(self, patient):
+        """ removes a patient who runs out of patience from the waiting room
+        :param patient: a patient in the waiting room
+        """
+
+        del self.patientsWaiting[patient.id]
+        patient.renegeEvent = None
+
+        # update statistics for the patient who leaves the waiting room
+        self.simOut.collect_patient_reneging_pcp_waiting_room(patient=patient)
+
+        # trace
+        self.trace.add_message(
+            str(patient) + ' runs out of patience and leaves the waiting room. Number waiting = '
+            + str(len(self.patientsWaiting)) + '.')
 
     def get_num_patients_waiting(self):
         """
@@ -72,7 +102,7 @@ class MHWaitingRoom:
         :param sim_out: simulation output
         :param trace: simulation trace
         """
-        self.patientsWaitingMH = []   # list of patients in the MH waiting room
+        self.patientsWaitingMH = OrderedDict()   # patients in the MH waiting room keyed by ID (in the order they joined)
         self.simOut = sim_out
         self.trace = trace
 
@@ -84,8 +114,8 @@ class MHWaitingRoom:
         # update statistics for the patient who joins the waiting room
         self.simOut.collect_patient_joining_mh_waiting_room(patient=patient)
 
-        # add the patient to the list of patients waiting
-        self.patientsWaitingMH.append(patient)
+        # add the patient to the patients waiting
+        self.patientsWaitingMH[patient.id] = patient
 
         # trace
         self.trace.add_message(
@@ -96,16 +126,40 @@ class MHWaitingRoom:
         :returns: the next patient in line
         """
 
+        # pop the patient
+        patient = self.patientsWaitingMH.popitem(last=False)[1]
+        _cancel_renege(patient=patient)
+
         # update statistics for the patient who leaves the waiting room
-        self.simOut.collect_patient_leaving_mh_waiting_room(patient=self.patientsWaitingMH[0])
+        self.simOut.collect_patient_leaving_mh_waiting_room(patient=patient)
 
         # trace
         self.trace.add_message(
-            str(self.patientsWaitingMH[0]) + ' leaves the MH waiting room. Number waiting = '
-            + str(len(self.patientsWaitingMH) - 1) + '.')
+            str(patient) + ' leaves the MH waiting room. Number waiting = ' + str(len(self.patientsWaitingMH)) + '.')
 
-        # pop the patient
-        return self.patientsWaitingMH.pop(0)
+        return patient
+
+    def remove_patient(self, patient):
+        """ removes a patient who runs out of patience from the waiting room
+        :param patient: a patient in the waiting room
+        """
+
+        del self.patientsWaitingMH[patient.id]
+        patient.renegeEvent = None
+
+        # update statistics for the patient who leaves the waiting room
+        self.simOut.collect_patient_reneging_mh_waiting_room(patient=patient)
+
+        # trace
+        self.trace.add_message(
+            str(patient) + ' runs out of patience and leaves the MH waiting room. Number waiting = '
+            + str(len(self.patientsWaitingMH)) + '.')
+
+    def get_longest_waiting_patient(self):
+        """
+        :return: the patient who has waited the longest (None if no patient is waiting)
+        """
+        return next(iter(self.patientsWaitingMH.values()), None)
 
     def get_num_patients_waiting(self):
         """
@@ -115,6 +169,8 @@ class MHWaitingRoom:
 
 
 class Physician:
+    __slots__ = ('id', 'serviceTimeDist', 'urgentCare', 'simCal', 'simOut', 'trace', 'isBusy', 'patientBeingServed')
+
     def __init__(self, id, service_time_dist, urgent_care, sim_cal, sim_out, trace):
         """ create a physician
         :param id: (integer) the physician ID
@@ -135,6 +191,8 @@ class Physician:
 
 
 class PCP(Physician):
+    __slots__ = ('endOfExam',)
+
     def __init__(self, id, service_time_dist, urgent_care, sim_cal, sim_out, trace):
         """ create a primary care physician
         :param id: (integer) id
@@ -147,6 +205,10 @@ class PCP(Physician):
         Physician.__init__(self, id=id, service_time_dist=service_time_dist, urgent_care=urgent_care, sim_cal=sim_cal,
                            sim_out=sim_out, trace=trace)
 
+        # the end of exam event of this physician (reused for every exam since
+        # at most one exam is in progress and the event leaves the calendar before it is processed)
+        self.endOfExam = EndOfExam(time=0, physician=self, urgent_care=urgent_care)
+
     def __str__(self):
         """ :returns (string) the PCP ID """
         return "PCP " + str(self.id)
@@ -168,12 +230,14 @@ class PCP(Physician):
         self.simOut.collect_patient_starting_pcp_exam()
 
         # find the exam completion time (current time + service time)
-        exam_completion_time = self.simCal.time + self.serviceTimeDist.sample(rng=rng)
+        if patient.examDuration is None:
+            exam_completion_time = self.simCal.time + self.serviceTimeDist.sample(rng=rng)
+        else:
+            exam_completion_time = self.simCal.time + patient.examDuration
 
         # schedule the end of exam
-        self.simCal.add_event(
-            event=EndOfExam(time=exam_completion_time, physician=self, urgent_care=self.urgentCare)
-        )
+        self.endOfExam.set_time(time=exam_completion_time)
+        self.simCal.add_event(event=self.endOfExam)
 
     def remove_patient(self):
         """ :returns the patient that was being served by this physician"""
@@ -199,6 +263,8 @@ class PCP(Physician):
 
 
 class MHP(Physician):
+    __slots__ = ('endOfConsult',)
+
     def __init__(self, id, service_time_dist, urgent_care, sim_cal, sim_out, trace):
         """ create a mental health physician
         :param id: (integer) the room ID
@@ -211,6 +277,9 @@ class MHP(Physician):
         Physician.__init__(self, id=id, service_time_dist=service_time_dist, urgent_care=urgent_care, sim_cal=sim_cal,
                            sim_out=sim_out, trace=trace)
 
+        # the end of consultation event of this physician (reused for every consultation)
+        self.endOfConsult = EndOfMentalHealthConsult(time=0, consult_room=self, urgent_care=urgent_care)
+
     def __str__(self):
         """ :returns (string) the mental health physican id """
         return "MHP " + str(self.id)
@@ -232,14 +301,14 @@ class MHP(Physician):
         self.simOut.collect_patient_starting_mh_exam()
 
         # find the exam completion time (current time + service time)
-        exam_completion_time = self.simCal.time + self.serviceTimeDist.sample(rng=rng)
+        if patient.mhConsultDuration is None:
+            exam_completion_time = self.simCal.time + self.serviceTimeDist.sample(rng=rng)
+        else:
+            exam_completion_time = self.simCal.time + patient.mhConsultDuration
 
         # schedule the end of exam
-        self.simCal.add_event(
-            event=EndOfMentalHealthConsult(time=exam_completion_time,
-                                           consult_room=self,
-                                           urgent_care=self.urgentCare)
-        )
+        self.endOfConsult.set_time(time=exam_completion_time)
+        self.simCal.add_event(event=self.endOfConsult)
 
     def remove_mh_patient(self):
         """ :returns the patient that was being served by mental health physician """
@@ -261,11 +330,13 @@ class MHP(Physician):
 
 
 class UrgentCare:
-    def __init__(self, id, parameters, sim_cal, sim_out, trace):
+    def __init__(self, id, parameters, sim_cal, sim_out, trace, arrival_log=None):
         """ creates an urgent care
         :param id: ID of this urgent care
         :param sim_cal: simulation calendar
         :parameters: parameters of this urgent care
+        :param arrival_log: the arrival log (ArrivalLog) to replay the current day of
+            (None to replay the first day of parameters.arrivalLog if provided)
         """
 
         self.id = id                   # urgent care id
@@ -276,6 +347,9 @@ class UrgentCare:
 
         self.ifOpen = True  # if the urgent care is open and admitting new patients
 
+        # the arrival event (reused for every arrival since only the next arrival is scheduled at any time)
+        self.nextArrival = Arrival(time=0, patient=None, urgent_care=self)
+
         # waiting room
         self.waitingRoom = PCPWaitingRoom(sim_out=self.simOutputs,
                                           trace=self.trace)
@@ -302,6 +376,77 @@ class UrgentCare:
                        sim_out=self.simOutputs,
                        trace=self.trace)
 
+        # log of historical arrivals to replay (None if arrivals are sampled from the distributions)
+        self.arrivalLog = arrival_log
+        self.ifOwnsArrivalLog = False   # if this urgent care opened the log (and should close it)
+        if self.arrivalLog is None and self.params.arrivalLog is not None:
+            # replay the first day of the log
+            self.arrivalLog = ArrivalLog(file_name=self.params.arrivalLog)
+            self.arrivalLog.next_day()
+            self.ifOwnsArrivalLog = True
+
+    def schedule_next_arrival(self, patient_id, rng):
+        """ schedules the arrival of the next patient
+        :param patient_id: ID of the next patient
+        :param rng: random number generator
+        """
+
+        # if arrivals are replayed from a log
+        if self.arrivalLog is not None:
+            self.__schedule_logged_arrival(patient_id=patient_id, rng=rng)
+            return
+
+        # find the arrival time of the next patient (current time + time until next arrival)
+        next_arrival_time = self.simCal.time + self.params.arrivalTimeDist.sample(rng=rng)
+
+        # find the depression status of the next patient
+        if_with_depression = False
+        if rng.random_sample() < self.params.probDepression:
+            if_with_depression = True
+
+        # schedule the arrival of the next patient
+        self.nextArrival.set_time(time=next_arrival_time)
+        self.nextArrival.patient = Patient(id=patient_id, if_with_depression=if_with_depression)
+        self.simCal.add_event(event=self.nextArrival)
+
+    def __schedule_logged_arrival(self, patient_id, rng):
+        """ schedules the arrival of the next patient in the arrival log
+        :param patient_id: ID of the next patient
+        :param rng: random number generator
+        """
+
+        # read the next visit (no more arrivals once the visits of this day are replayed)
+        visit = self.arrivalLog.get_next_visit()
+        if visit is None:
+            self.trace.add_message('No more visits on this day of the arrival log.')
+            return
+
+        # find the depression status of the next patient if it is not logged
+        if_with_depression = visit.ifWithDepression
+        if if_with_depression is None:
+            if_with_depression = rng.random_sample() < self.params.probDepression
+
+        patient = Patient(id=patient_id, if_with_depression=if_with_depression)
+        patient.examDuration = visit.examDuration
+        patient.mhConsultDuration = visit.mhConsultDuration
+
+        # schedule the arrival of the next patient
+        self.nextArrival.set_time(time=visit.time)
+        self.nextArrival.patient = patient
+        self.simCal.add_event(event=self.nextArrival)
+
+    def close_arrival_log(self):
+        """ releases the arrival log if this urgent care opened it
+        (and warns if the log has days that were not replayed) """
+
+        if self.arrivalLog is None or not self.ifOwnsArrivalLog:
+            return
+
+        if self.arrivalLog.next_day():
+            warnings.warn('Only the first day of ' + self.arrivalLog.fileName + ' was replayed '
+                          '(use LoggedDaysUrgentCareModel to replay all of its days).')
+        self.arrivalLog.close()
+
     def process_new_patient(self, patient, rng):
         """ receives a new patient
         :param patient: the new patient
@@ -317,6 +462,14 @@ class UrgentCare:
             self.trace.add_message('Urgent care is closed. '+str(patient)+' does not get admitted.')
             return
 
+        # the patient leaves without joining if too many patients are waiting (balking)
+        if self.params.maxPCPQueue is not None \
+                and self.waitingRoom.get_num_patients_waiting() >= self.params.maxPCPQueue:
+            self.trace.add_message(str(patient) + ' does not join the long queue and leaves.')
+            self.simOutputs.collect_patient_balking(patient=patient)
+            self.schedule_next_arrival(patient_id=patient.id + 1, rng=rng)
+            return
+
         # collect statistics on new patient
         self.simOutputs.collect_patient_arrival(patient=patient)
 
@@ -324,6 +477,8 @@ class UrgentCare:
         if self.waitingRoom.get_num_patients_waiting() > 0:
             # if anyone is waiting, add the patient to the waiting room
             self.waitingRoom.add_patient(patient=patient)
+            self.__schedule_renege(patient=patient, waiting_room=self.waitingRoom,
+                                   patience_dist=self.params.pcpPatienceDist, rng=rng)
         else:
             # find an idle physician
             idle_pcp_found = False
@@ -340,23 +495,11 @@ class UrgentCare:
             if not idle_pcp_found:
                 # add the patient to the waiting room
                 self.waitingRoom.add_patient(patient=patient)
-
-        # find the arrival time of the next patient (current time + time until next arrival)
-        next_arrival_time = self.simCal.time + self.params.arrivalTimeDist.sample(rng=rng)
-
-        # find the depression status of the next patient
-        if_with_depression = False
-        if rng.random_sample() < self.params.probDepression:
-            if_with_depression = True
+                self.__schedule_renege(patient=patient, waiting_room=self.waitingRoom,
+                                       patience_dist=self.params.pcpPatienceDist, rng=rng)
 
         # schedule the arrival of the next patient
-        self.simCal.add_event(
-            event=Arrival(
-                time=next_arrival_time,
-                patient=Patient(id=patient.id + 1, if_with_depression=if_with_depression),
-                urgent_care=self
-            )
-        )
+        self.schedule_next_arrival(patient_id=patient.id + 1, rng=rng)
 
     def process_end_of_exam(self, physician, rng):
         """ processes the end of exam in the specified exam room
@@ -377,6 +520,8 @@ class UrgentCare:
             if self.MHP.isBusy:
                 # the patient will join the waiting room in the mental health unity
                 self.mhConsultWaitingRoom.add_patient(patient=this_patient)
+                self.__schedule_renege(patient=this_patient, waiting_room=self.mhConsultWaitingRoom,
+                                       patience_dist=self.params.mhPatienceDist, rng=rng)
             else:
                 # this patient starts receiving mental health consultation
                 self.MHP.consult(patient=this_patient, rng=rng)
@@ -404,6 +549,35 @@ class UrgentCare:
             # start serving the next patient in line
             mhp.consult(patient=self.mhConsultWaitingRoom.get_next_patient(), rng=rng)
 
+    def process_renege(self, patient, waiting_room):
+        """ process a patient running out of patience in a waiting room
+        :param patient: the patient who leaves
+        :param waiting_room: the waiting room the patient leaves
+        """
+
+        # trace
+        self.trace.add_message('Processing ' + str(patient) + ' running out of patience.')
+
+        # the patient leaves the urgent care
+        waiting_room.remove_patient(patient=patient)
+
+    def __schedule_renege(self, patient, waiting_room, patience_dist, rng):
+        """ schedules the time the patient leaves the waiting room if not served by then
+        :param patient: a patient who just joined the waiting room
+        :param waiting_room: the waiting room
+        :param patience_dist: distribution of patience time (None if patients do not leave)
+        :param rng: random number generator
+        """
+
+        if patience_dist is None:
+            return
+
+        patient.renegeEvent = Renege(time=self.simCal.time + patience_dist.sample(rng=rng),
+                                     patient=patient,
+                                     waiting_room=waiting_room,
+                                     urgent_care=self)
+        self.simCal.add_event(event=patient.renegeEvent)
+
     def process_close_urgent_care(self):
         """ process the closing of the urgent care """
 
@@ -411,4 +585,13 @@ class UrgentCare:
         self.trace.add_message('Processing the closing of the urgent care.')
 
         # close the urgent care
-        self.ifOpen = False
\ No newline at end of file
+        self.ifOpen = False
+
+
+def _cancel_renege(patient):
+    """ cancels the scheduled renege event of a patient who leaves the waiting room to receive service
+    (the event stays in the simulation calendar and is ignored when it occurs) """
+
+    if patient.renegeEvent is not None:
+        patient.renegeEvent.cancelled = True
+        patient.renegeEvent = None
\ No newline at end of file
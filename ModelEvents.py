@@ -1,3 +1,5 @@
+import itertools
+
 from deampy.discrete_event_sim import SimulationEvent
 
 
@@ -7,9 +9,40 @@ ARRIVAL = 2
 END_OF_EXAM = 1
 END_OF_MH_CONSULT = 0
 CLOSE = 3
+RENEGE = 4
+
+# sequence numbers of scheduled events (to order the events that occur at the same time with the same priority)
+_sequence = itertools.count()
+
+
+class UrgentCareEvent(SimulationEvent):
+    __slots__ = ('sequence',)
+
+    def __init__(self, time, priority):
+        """
+        base class of the urgent care simulation events
+        :param time: time of the event
+        :param priority: priority of the event
+        """
+        SimulationEvent.__init__(self, time=time, priority=priority)
+        self.sequence = next(_sequence)
 
+    def set_time(self, time):
+        """ sets the time of an event that is reused (before it is added to the simulation calendar again)
+        :param time: new time of the event
+        """
+        self.time = time
+        self.sequence = next(_sequence)
+
+    def __lt__(self, other):
+        """ events that occur at the same time with the same priority are processed
+        in the order they were scheduled (the simulation calendar compares them when times and priorities tie) """
+        return self.sequence < other.sequence
+
+
+class Arrival(UrgentCareEvent):
+    __slots__ = ('patient', 'urgentCare')
 
-class Arrival(SimulationEvent):
     def __init__(self, time, patient, urgent_care):
         """
         creates the arrival of the next patient event
@@ -18,7 +51,7 @@ class Arrival(SimulationEvent):
         :param urgent_care: the urgent care
         """
         # initialize the super class
-        SimulationEvent.__init__(self, time=time, priority=ARRIVAL)
+        UrgentCareEvent.__init__(self, time=time, priority=ARRIVAL)
 
         self.patient = patient
         self.urgentCare = urgent_care
@@ -30,7 +63,9 @@ class Arrival(SimulationEvent):
         self.urgentCare.process_new_patient(patient=self.patient, rng=rng)
 
 
-class EndOfExam(SimulationEvent):
+class EndOfExam(UrgentCareEvent):
+    __slots__ = ('physician', 'urgentCare')
+
     def __init__(self, time, physician, urgent_care):
         """
         create the end of service for an specified exam room
@@ -39,7 +74,7 @@ class EndOfExam(SimulationEvent):
         :param urgent_care: the urgent care
         """
         # initialize the base class
-        SimulationEvent.__init__(self, time=time, priority=END_OF_EXAM)
+        UrgentCareEvent.__init__(self, time=time, priority=END_OF_EXAM)
 
         self.physician = physician
         self.urgentCare = urgent_care
@@ -51,7 +86,9 @@ class EndOfExam(SimulationEvent):
         self.urgentCare.process_end_of_exam(physician=self.physician, rng=rng)
 
 
-class EndOfMentalHealthConsult(SimulationEvent):
+class EndOfMentalHealthConsult(UrgentCareEvent):
+    __slots__ = ('consultRoom', 'urgentCare')
+
     def __init__(self, time, consult_room, urgent_care):
         """
         create the end of mental health consultation
@@ -60,7 +97,7 @@ class EndOfMentalHealthConsult(SimulationEvent):
         :param urgent_care: the urgent care
         """
         # initialize the base class
-        SimulationEvent.__init__(self, time=time, priority=END_OF_MH_CONSULT)
+        UrgentCareEvent.__init__(self, time=time, priority=END_OF_MH_CONSULT)
 
         self.consultRoom = consult_room
         self.urgentCare = urgent_care
@@ -72,7 +109,38 @@ class EndOfMentalHealthConsult(SimulationEvent):
         self.urgentCare.process_end_of_consultation(mhp=self.consultRoom, rng=rng)
 
 
-class CloseUrgentCare(SimulationEvent):
+class Renege(UrgentCareEvent):
+    __slots__ = ('patient', 'waitingRoom', 'urgentCare', 'cancelled')
+
+    def __init__(self, time, patient, waiting_room, urgent_care):
+        """
+        create the event of a patient leaving the waiting room after running out of patience
+        :param time: time the patient runs out of patience
+        :param patient: the waiting patient
+        :param waiting_room: the waiting room
+        :param urgent_care: the urgent care
+        """
+        # initialize the base class
+        UrgentCareEvent.__init__(self, time=time, priority=RENEGE)
+
+        self.patient = patient
+        self.waitingRoom = waiting_room
+        self.urgentCare = urgent_care
+        self.cancelled = False  # set to True when the patient starts service before running out of patience
+
+    def process(self, rng=None):
+        """ processes the patient leaving the waiting room """
+
+        # cancelled events are ignored (lazy deletion from the simulation calendar)
+        if self.cancelled:
+            return
+
+        self.urgentCare.process_renege(patient=self.patient, waiting_room=self.waitingRoom)
+
+
+class CloseUrgentCare(UrgentCareEvent):
+    __slots__ = ('urgentCare',)
+
     def __init__(self, time, urgent_care):
         """
         create the event to close the urgent care
@@ -83,7 +151,7 @@ class CloseUrgentCare(SimulationEvent):
         self.urgentCare = urgent_care
 
         # call the super class initialization
-        SimulationEvent.__init__(self, time=time, priority=CLOSE)
+        UrgentCareEvent.__init__(self, time=time, priority=CLOSE)
 
     def process(self, rng=None):
         """ processes the closing event """
@@ -1,5 +1,9 @@
+import math
+
 from deampy.sample_path import PrevalenceSamplePath
 
+import InputData as D
+
 
 class SimOutputs:
     # to collect the outputs of a simulation run
@@ -12,12 +16,17 @@ class SimOutputs:
 
         self.simCal = sim_cal           # simulation calendar (to know the current time)
         self.traceOn = trace_on         # if should prepare patient summary report
-        self.nPatientsArrived = 0       # number of patients arrived
+        self.nPatientsArrived = 0       # number of patients arrived (including those who balked)
         self.nPatientsServed = 0         # number of patients served
         self.nPatientsReceivedMHConsult = 0  # number of patients who received MH consultation
-        self.patientTimeInSystem = []   # observations on patients time in urgent care
-        self.patientTimeInPCPWaitingRoom = []  # observations on patients time in the waiting room
-        self.patientTimeInMHWaitingRoom = []  # observations on patients time in MH waiting room
+        self.nPatientsBalked = 0        # number of patients who left on arrival because the queue was too long
+        self.nPatientsRenegedPCP = 0    # number of patients who left the PCP waiting room before being served
+        self.nPatientsRenegedMH = 0     # number of patients who left the MH waiting room before being served
+        self.patientTimeInSystem = []   # observations on patients time in urgent care (patients served)
+        self.patientTimeInPCPWaitingRoom = []  # observations on patients time in the waiting room (patients seen by PCP)
+        self.patientTimeInMHWaitingRoom = []  # observations on patients time in MH waiting room (patients seen by MHS)
+        self.patientTimeInPCPWaitingRoomReneged = []   # time in the waiting room of patients who left before PCP
+        self.patientTimeInMHWaitingRoomReneged = []    # time in the MH waiting room of patients who left before MHS
 
         self.patientSummary = []    # id, tArrived, tLeft, duration waited, duration in the system
         if self.traceOn:
@@ -47,6 +56,9 @@ class SimOutputs:
             name='Utilization of Mental Health Specialist', initial_size=0
         )
 
+        # time-bucketed operational metrics (e.g. by hour since opening)
+        self.bucketStats = TimeBucketStats()
+
     def collect_patient_arrival(self, patient):
         """ collects statistics upon arrival of a patient
         :param patient: the patient who just arrived
@@ -61,6 +73,9 @@ class SimOutputs:
         # store arrival time of this patient
         patient.tArrived = self.simCal.time
 
+        # update the time-bucketed metrics
+        self.bucketStats.record_arrival(time=self.simCal.time)
+
     def collect_patient_joining_pcp_waiting_room(self, patient):
         """ collects statistics when a patient joins the pcp waiting room
         :param patient: the patient who is joining the pcp waiting room
@@ -71,6 +86,7 @@ class SimOutputs:
 
         # update the sample path of patients waiting for see pcp
         self.nPatientsWaitingPCP.record_increment(time=self.simCal.time, increment=1)
+        self.bucketStats.record_pcp_queue_change(time=self.simCal.time, increment=1)
 
     def collect_patient_joining_mh_waiting_room(self, patient):
         """ collects statistics when a patient joins the waiting room for mental health specialist (MHS)
@@ -82,6 +98,7 @@ class SimOutputs:
 
         # update the sample path of patients waiting
         self.nPatientsWaitingMH.record_increment(time=self.simCal.time, increment=1)
+        self.bucketStats.record_mh_queue_change(time=self.simCal.time, increment=1)
 
     def collect_patient_leaving_pcp_waiting_room(self, patient):
         """ collects statistics when a patient leave the PCP waiting room
@@ -93,6 +110,7 @@ class SimOutputs:
 
         # update the sample path
         self.nPatientsWaitingPCP.record_increment(time=self.simCal.time, increment=-1)
+        self.bucketStats.record_pcp_queue_change(time=self.simCal.time, increment=-1)
 
     def collect_patient_leaving_mh_waiting_room(self, patient):
         """ collects statistics when a patient leave the MHS waiting room
@@ -104,6 +122,65 @@ class SimOutputs:
 
         # update the sample path
         self.nPatientsWaitingMH.record_increment(time=self.simCal.time, increment=-1)
+        self.bucketStats.record_mh_queue_change(time=self.simCal.time, increment=-1)
+
+    def collect_patient_reneging_pcp_waiting_room(self, patient):
+        """ collects statistics when a patient leaves the PCP waiting room and the urgent care before being served
+        :param patient: the patient who leaves
+        """
+
+        self.nPatientsRenegedPCP += 1
+        patient.tLeftPCPWaitingRoom = self.simCal.time
+
+        # the time waited until leaving (a lower bound on the time the patient would have waited for PCP)
+        time_waiting_pcp = _get_pcp_waiting_time(patient=patient)
+        self.patientTimeInPCPWaitingRoomReneged.append(time_waiting_pcp)
+
+        # update the sample paths
+        self.nPatientsWaitingPCP.record_increment(time=self.simCal.time, increment=-1)
+        self.bucketStats.record_pcp_queue_change(time=self.simCal.time, increment=-1)
+        self.nPatientInSystem.record_increment(time=self.simCal.time, increment=-1)
+
+        # update the time-bucketed metrics
+        self.bucketStats.record_abandonment(time=self.simCal.time)
+        self.bucketStats.record_pcp_wait(time_arrived=patient.tArrived, time_waiting=time_waiting_pcp,
+                                         if_served=False)
+
+    def collect_patient_reneging_mh_waiting_room(self, patient):
+        """ collects statistics when a patient leaves the MHS waiting room and the urgent care before being served
+        :param patient: the patient who leaves
+        """
+
+        self.nPatientsRenegedMH += 1
+        patient.tLeftMHWaitingRoom = self.simCal.time
+
+        # the patient was seen by a PCP before joining the MH waiting room
+        time_waiting_pcp = _get_pcp_waiting_time(patient=patient)
+        self.patientTimeInPCPWaitingRoom.append(time_waiting_pcp)
+        self.patientTimeInMHWaitingRoomReneged.append(patient.tLeftMHWaitingRoom - patient.tJoinedMHWaitingRoom)
+
+        # update the sample paths
+        self.nPatientsWaitingMH.record_increment(time=self.simCal.time, increment=-1)
+        self.bucketStats.record_mh_queue_change(time=self.simCal.time, increment=-1)
+        self.nPatientInSystem.record_increment(time=self.simCal.time, increment=-1)
+
+        # update the time-bucketed metrics
+        self.bucketStats.record_abandonment(time=self.simCal.time)
+        self.bucketStats.record_pcp_wait(time_arrived=patient.tArrived, time_waiting=time_waiting_pcp)
+
+    def collect_patient_balking(self, patient):
+        """ collects statistics for a patient who leaves on arrival because the queue is too long
+        (the patient is counted as arrived but does not enter the urgent care)
+        :param patient: the patient who leaves
+        """
+
+        self.nPatientsArrived += 1
+        self.nPatientsBalked += 1
+        patient.tArrived = self.simCal.time
+
+        # update the time-bucketed metrics
+        self.bucketStats.record_arrival(time=self.simCal.time)
+        self.bucketStats.record_abandonment(time=self.simCal.time)
 
     def collect_patient_departure(self, patient):
         """ collects statistics for a departing patient
@@ -114,14 +191,15 @@ class SimOutputs:
         self.nPatientInSystem.record_increment(time=self.simCal.time, increment=-1)
 
         time_in_system = self.simCal.time - patient.tArrived
-        if patient.tJoinedPCPWaitingRoom is None:
-            time_waiting_pcp = 0
-        else:
-            time_waiting_pcp = patient.tLeftPCPWaitingRoom - patient.tJoinedPCPWaitingRoom
+        time_waiting_pcp = _get_pcp_waiting_time(patient=patient)
 
         self.patientTimeInPCPWaitingRoom.append(time_waiting_pcp)
         self.patientTimeInSystem.append(time_in_system)
 
+        # update the time-bucketed metrics (waiting time is counted in the bucket the patient arrived in)
+        self.bucketStats.record_departure(time=self.simCal.time)
+        self.bucketStats.record_pcp_wait(time_arrived=patient.tArrived, time_waiting=time_waiting_pcp)
+
         if patient.ifWithDepression:
             self.nPatientsReceivedMHConsult += 1
             if patient.tJoinedMHWaitingRoom is None:
@@ -146,45 +224,345 @@ class SimOutputs:
         """ collects statistics for a patient who just started the exam with a pcp """
 
         self.nPCPBusy.record_increment(time=self.simCal.time, increment=1)
+        self.bucketStats.record_pcp_busy_change(time=self.simCal.time, increment=1)
 
     def collect_patient_ending_pcp_exam(self):
 
         self.nPCPBusy.record_increment(time=self.simCal.time, increment=-1)
+        self.bucketStats.record_pcp_busy_change(time=self.simCal.time, increment=-1)
 
     def collect_patient_starting_mh_exam(self):
         """ collects statistics for a patient who just started the mh consult """
 
         self.nMHSBusy.record_increment(time=self.simCal.time, increment=1)
 
-    def collect_end_of_simulation(self):
+    def collect_end_of_simulation(self, time=None):
         """
         collects the performance statistics at the end of the simulation
+        :param time: time the simulation ended (the current time if None)
         """
 
+        if time is None:
+            time = self.simCal.time
+
         # update sample paths
-        self.nPatientsWaitingMH.close(time=self.simCal.time)
-        self.nPatientsWaitingPCP.close(time=self.simCal.time)
-        self.nPatientInSystem.close(time=self.simCal.time)
-        self.nPCPBusy.close(time=self.simCal.time)
-        self.nMHSBusy.close(time=self.simCal.time)
+        self.nPatientsWaitingMH.close(time=time)
+        self.nPatientsWaitingPCP.close(time=time)
+        self.nPatientInSystem.close(time=time)
+        self.nPCPBusy.close(time=time)
+        self.nMHSBusy.close(time=time)
+        self.bucketStats.close(time=time)
 
     def get_ave_patient_time_in_system(self):
         """
-        :return: average patient time in system
+        :return: average patient time in system (of patients served, not those who left before being served;
+            nan if no patient was served)
         """
 
-        return sum(self.patientTimeInSystem)/len(self.patientTimeInSystem)
+        return _ratio(sum(self.patientTimeInSystem), len(self.patientTimeInSystem))
 
     def get_ave_patient_waiting_time(self):
         """
-        :return: average patient waiting time
+        :return: average patient waiting time (of patients seen by a PCP; the time waited by patients who
+            left before being seen is in patientTimeInPCPWaitingRoomReneged; nan if no patient was seen)
         """
 
-        return sum(self.patientTimeInPCPWaitingRoom)/len(self.patientTimeInPCPWaitingRoom)
+        return _ratio(sum(self.patientTimeInPCPWaitingRoom), len(self.patientTimeInPCPWaitingRoom))
 
     def get_ave_patient_mh_waiting_time(self):
         """
-        :return: average patient waiting time for MHS
+        :return: average patient waiting time for MHS (of patients seen by MHS; the time waited by patients who
+            left before being seen is in patientTimeInMHWaitingRoomReneged; nan if no patient was seen,
+            e.g. when no patient has depression)
+        """
+
+        return _ratio(sum(self.patientTimeInMHWaitingRoom), len(self.patientTimeInMHWaitingRoom))
+
+
+class TimeBucketStats:
+    # to collect operational metrics in fixed time buckets during a simulation run
+    # (each event updates its bucket in constant time so no sample path has to be post-processed)
+    # bucket i covers the simulation time [i * bucket_width, (i + 1) * bucket_width) from the opening until the end
+    # of the run (buckets are added as the simulation time advances); fold() adds them up by time of day
+
+    def __init__(self, bucket_width=D.BUCKET_WIDTH, wait_bin_width=D.WAIT_BIN_WIDTH, max_wait=D.MAX_WAIT):
+        """
+        :param bucket_width: (hours) width of each time bucket
+        :param wait_bin_width: (hours) width of the bins of waiting time histograms
+        :param max_wait: (hours) waiting times above this value are counted in the last bin
+        """
+
+        self.bucketWidth = bucket_width
+        self.waitBinWidth = wait_bin_width
+        self.maxWait = max_wait
+        self.nWaitBins = int(math.ceil(max_wait / wait_bin_width)) + 1
+        self.period = None      # (hours) period the buckets are folded over (None if not folded)
+        self.clockOffset = 0    # (hours) clock time of the start of bucket 0 if folded
+
+        self.observedTime = []      # simulated time spent in each bucket
+        self.nArrivals = []         # number of patients arrived in each bucket (including balking)
+        self.nDepartures = []       # number of patients served and departed in each bucket
+        self.nAbandoned = []        # number of patients who balked or reneged in each bucket
+        self.pcpQueueArea = []      # area under the number of patients waiting for PCP
+        self.mhQueueArea = []       # area under the number of patients waiting for MHS
+        self.pcpBusyArea = []       # area under the number of busy PCPs
+        # histograms of PCP waiting times for patients arrived in each bucket (patients seen by a PCP)
+        self.waitHistograms = []
+        # histograms of the time waited for PCP by patients arrived in each bucket who left before being seen
+        self.renegedWaitHistograms = []
+
+        # current values of the tracked quantities
+        self.tLastUpdated = 0
+        self.nPCPQueue = 0
+        self.nMHQueue = 0
+        self.nPCPBusy = 0
+
+    def get_n_buckets(self):
+        """
+        :return: number of buckets
+        """
+        return len(self.observedTime)
+
+    def get_bucket(self, time):
+        """
+        :param time: simulation time
+        :return: index of the bucket that contains this time (buckets are added up to this time if needed)
+        """
+        bucket = int(time // self.bucketWidth)
+        if bucket >= len(self.observedTime):
+            self.__add_buckets(n_buckets=bucket + 1)
+        return bucket
+
+    def record_arrival(self, time):
+        """ records a patient arrival
+        :param time: time of arrival
         """
+        self.nArrivals[self.get_bucket(time)] += 1
 
-        return sum(self.patientTimeInMHWaitingRoom)/len(self.patientTimeInMHWaitingRoom)
\ No newline at end of file
+    def record_departure(self, time):
+        """ records the departure of a patient who was served
+        :param time: time of departure
+        """
+        self.nDepartures[self.get_bucket(time)] += 1
+
+    def record_abandonment(self, time):
+        """ records a patient who balked or reneged
+        :param time: time the patient left
+        """
+        self.nAbandoned[self.get_bucket(time)] += 1
+
+    def record_pcp_wait(self, time_arrived, time_waiting, if_served=True):
+        """ records the time a patient waited for PCP (in the bucket the patient arrived in)
+        :param time_arrived: time the patient arrived
+        :param time_waiting: time the patient waited for PCP
+        :param if_served: set to False if the patient left the waiting room before being seen
+        """
+        histograms = self.waitHistograms if if_served else self.renegedWaitHistograms
+        wait_bin = min(int(time_waiting / self.waitBinWidth), self.nWaitBins - 1)
+        histograms[self.get_bucket(time_arrived)][wait_bin] += 1
+
+    def record_pcp_queue_change(self, time, increment):
+        """ records a change in the number of patients waiting for PCP
+        :param time: time of change
+        :param increment: (integer) change in the number of patients waiting
+        """
+        self.__advance(time=time)
+        self.nPCPQueue += increment
+
+    def record_mh_queue_change(self, time, increment):
+        """ records a change in the number of patients waiting for MHS
+        :param time: time of change
+        :param increment: (integer) change in the number of patients waiting
+        """
+        self.__advance(time=time)
+        self.nMHQueue += increment
+
+    def record_pcp_busy_change(self, time, increment):
+        """ records a change in the number of busy PCPs
+        :param time: time of change
+        :param increment: (integer) change in the number of busy PCPs
+        """
+        self.__advance(time=time)
+        self.nPCPBusy += increment
+
+    def close(self, time):
+        """ accumulates the areas until the end of the simulation
+        :param time: time the simulation ended
+        """
+        self.__advance(time=time)
+
+    def merge(self, other):
+        """ adds the metrics collected in another replication to these metrics
+        :param other: time-bucketed metrics of another replication (with the same buckets and bins)
+        """
+
+        if other.bucketWidth != self.bucketWidth or other.period != self.period \
+                or other.clockOffset != self.clockOffset or other.nWaitBins != self.nWaitBins \
+                or other.waitBinWidth != self.waitBinWidth:
+            raise ValueError('Only time-bucketed metrics with the same buckets and bins can be merged.')
+
+        # runs of different lengths cover different numbers of buckets
+        self.__add_buckets(n_buckets=other.get_n_buckets())
+        for i in range(other.get_n_buckets()):
+            self.__add_bucket(i=i, other=other, j=i)
+
+    def fold(self, period=24, clock_offset=D.OPENING_HOUR):
+        """ adds up the buckets by time of day (e.g. hour-of-day curves)
+        :param period: (hours) period to fold the buckets over (24 for time of day)
+        :param clock_offset: (hours) clock time of the opening of the urgent care (simulation time 0),
+            e.g. 8 if the urgent care opens at 8am
+        :return: time-bucketed metrics where bucket i covers the clock time [i * bucket_width, (i + 1) * bucket_width)
+            (for reporting; metrics of days that run past the period, e.g. the hours after midnight spent
+            serving the patients still waiting, are added to the same clock times of the first day)
+        """
+
+        n_buckets = period / self.bucketWidth
+        shift = clock_offset / self.bucketWidth
+        if n_buckets != int(n_buckets) or shift != int(shift):
+            raise ValueError('The period and the clock offset should be multiples of the bucket width.')
+
+        folded = TimeBucketStats(bucket_width=self.bucketWidth, wait_bin_width=self.waitBinWidth,
+                                 max_wait=self.maxWait)
+        folded.period = period
+        folded.clockOffset = clock_offset
+        folded.__add_buckets(n_buckets=int(n_buckets))
+        for i in range(self.get_n_buckets()):
+            folded.__add_bucket(i=(i + int(shift)) % int(n_buckets), other=self, j=i)
+
+        return folded
+
+    def get_arrival_rates(self):
+        """
+        :return: (list) average number of arrivals per hour in each bucket
+        """
+        return [_ratio(n, t) for n, t in zip(self.nArrivals, self.observedTime)]
+
+    def get_departure_rates(self):
+        """
+        :return: (list) average number of departures (of patients served) per hour in each bucket
+        """
+        return [_ratio(n, t) for n, t in zip(self.nDepartures, self.observedTime)]
+
+    def get_abandonment_rates(self):
+        """
+        :return: (list) average number of patients who balked or reneged per hour in each bucket
+        """
+        return [_ratio(n, t) for n, t in zip(self.nAbandoned, self.observedTime)]
+
+    def get_ave_pcp_queue_lengths(self):
+        """
+        :return: (list) time-average number of patients waiting for PCP in each bucket
+        """
+        return [_ratio(area, t) for area, t in zip(self.pcpQueueArea, self.observedTime)]
+
+    def get_ave_mh_queue_lengths(self):
+        """
+        :return: (list) time-average number of patients waiting for MHS in each bucket
+        """
+        return [_ratio(area, t) for area, t in zip(self.mhQueueArea, self.observedTime)]
+
+    def get_pcp_utilizations(self, n_pcps):
+        """
+        :param n_pcps: number of PCPs
+        :return: (list) PCP utilization in each bucket
+        """
+        return [_ratio(area, t * n_pcps) for area, t in zip(self.pcpBusyArea, self.observedTime)]
+
+    def get_wait_percentiles(self, percentile, if_include_reneged=False):
+        """
+        :param percentile: (float between 0 and 100) percentile of PCP waiting time
+        :param if_include_reneged: set to True to include the time waited by patients who left before being seen
+            (a lower bound on the time they would have waited)
+        :return: (list) percentile of PCP waiting time of patients arrived in each bucket
+            (only patients who departed or left before the simulation ended are included;
+            waiting times are resolved to the bin width; nan if no patient arrived in the bucket)
+        """
+
+        percentiles = []
+        for i, histogram in enumerate(self.waitHistograms):
+            if if_include_reneged:
+                histogram = [n + m for n, m in zip(histogram, self.renegedWaitHistograms[i])]
+            n_obs = sum(histogram)
+            if n_obs == 0:
+                percentiles.append(math.nan)
+                continue
+
+            # find the first bin where the cumulative count reaches the percentile
+            target = percentile / 100 * n_obs
+            cumulative = 0
+            for j, count in enumerate(histogram):
+                cumulative += count
+                if count > 0 and cumulative >= target:
+                    # interpolate within the bin
+                    percentiles.append((j + 1 - (cumulative - target) / count) * self.waitBinWidth)
+                    break
+
+        return percentiles
+
+    def __advance(self, time):
+        """ accumulates the areas under the tracked quantities from the last update until this time
+        :param time: current time
+        """
+
+        t = self.tLastUpdated
+        k = int(t // self.bucketWidth)     # index of the current bucket
+        while t < time:
+            # end of the current bucket or this time, whichever comes first
+            t_next = min((k + 1) * self.bucketWidth, time)
+            if t_next > t:
+                if k >= len(self.observedTime):
+                    self.__add_buckets(n_buckets=k + 1)
+                duration = t_next - t
+                self.observedTime[k] += duration
+                self.pcpQueueArea[k] += self.nPCPQueue * duration
+                self.mhQueueArea[k] += self.nMHQueue * duration
+                self.pcpBusyArea[k] += self.nPCPBusy * duration
+                t = t_next
+            k += 1
+
+        self.tLastUpdated = time
+
+    def __add_buckets(self, n_buckets):
+        """ adds empty buckets until there are n_buckets buckets
+        :param n_buckets: number of buckets
+        """
+        for i in range(len(self.observedTime), n_buckets):
+            self.observedTime.append(0)
+            self.nArrivals.append(0)
+            self.nDepartures.append(0)
+            self.nAbandoned.append(0)
+            self.pcpQueueArea.append(0)
+            self.mhQueueArea.append(0)
+            self.pcpBusyArea.append(0)
+            self.waitHistograms.append([0] * self.nWaitBins)
+            self.renegedWaitHistograms.append([0] * self.nWaitBins)
+
+    def __add_bucket(self, i, other, j):
+        """ adds bucket j of other time-bucketed metrics to bucket i of these metrics """
+
+        self.observedTime[i] += other.observedTime[j]
+        self.nArrivals[i] += other.nArrivals[j]
+        self.nDepartures[i] += other.nDepartures[j]
+        self.nAbandoned[i] += other.nAbandoned[j]
+        self.pcpQueueArea[i] += other.pcpQueueArea[j]
+        self.mhQueueArea[i] += other.mhQueueArea[j]
+        self.pcpBusyArea[i] += other.pcpBusyArea[j]
+        for k in range(self.nWaitBins):
+            self.waitHistograms[i][k] += other.waitHistograms[j][k]
+            self.renegedWaitHistograms[i][k] += other.renegedWaitHistograms[j][k]
+
+
+def _get_pcp_waiting_time(patient):
+    """ :returns the time the patient waited for PCP (after leaving the PCP waiting room) """
+
+    if patient.tJoinedPCPWaitingRoom is None:
+        return 0
+    return patient.tLeftPCPWaitingRoom - patient.tJoinedPCPWaitingRoom
+
+
+def _ratio(numerator, denominator):
+    """ :returns numerator / denominator or nan if the denominator is zero """
+
+    if denominator == 0:
+        return math.nan
+    return numerator / denominator
\ No newline at end of file
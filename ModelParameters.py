@@ -1,13 +1,45 @@
 import InputData as D
 from deampy.random_variates import Exponential
 
+# default value of the arguments that are read from InputData
+# (None is a valid value that turns off some features, e.g. patience times)
+_FROM_INPUT_DATA = object()
+
 
 class Parameters:
     # class to contain the parameters of the urgent care model
-    def __init__(self):
-        self.hoursOpen = D.HOURS_OPEN
-        self.nPCPs = D.N_PCP
-        self.arrivalTimeDist = Exponential(scale=D.MEAN_ARRIVAL_TIME)
-        self.examTimeDist = Exponential(scale=D.MEAN_EXAM_DURATION)
-        self.probDepression = D.PROB_DEPRESSION
-        self.mentalHealthConsultDist = Exponential(scale=D.MEAN_MH_CONSULT)
\ No newline at end of file
+    def __init__(self, hours_open=_FROM_INPUT_DATA, n_pcps=_FROM_INPUT_DATA, mean_arrival_time=_FROM_INPUT_DATA,
+                 mean_exam_duration=_FROM_INPUT_DATA, prob_depression=_FROM_INPUT_DATA,
+                 mean_mh_consult=_FROM_INPUT_DATA, mean_pcp_patience=_FROM_INPUT_DATA,
+                 mean_mh_patience=_FROM_INPUT_DATA, max_pcp_queue=_FROM_INPUT_DATA, arrival_log=_FROM_INPUT_DATA):
+        """ (arguments that are not provided are read from InputData when the parameters are created)
+        :param hours_open: hours the urgent care opens
+        :param n_pcps: number of primary-care physicians
+        :param mean_arrival_time: mean patients inter-arrival time (hours)
+        :param mean_exam_duration: mean of exam duration (hours)
+        :param prob_depression: probability that a patient is diagnosed with depression
+        :param mean_mh_consult: mean duration of mental health consultation (hours)
+        :param mean_pcp_patience: mean time patients wait for PCP before leaving (hours, None if they do not leave)
+        :param mean_mh_patience: mean time patients wait for MHS before leaving (hours, None if they do not leave)
+        :param max_pcp_queue: arriving patients leave if this many patients are waiting for PCP (None for no limit)
+        :param arrival_log: path to a .csv or .parquet log of historical arrivals to replay
+            in place of the distributions (None to sample arrivals)
+        """
+        mean_pcp_patience = _default(mean_pcp_patience, D.MEAN_PCP_PATIENCE)
+        mean_mh_patience = _default(mean_mh_patience, D.MEAN_MH_PATIENCE)
+
+        self.hoursOpen = _default(hours_open, D.HOURS_OPEN)
+        self.nPCPs = _default(n_pcps, D.N_PCP)
+        self.arrivalTimeDist = Exponential(scale=_default(mean_arrival_time, D.MEAN_ARRIVAL_TIME))
+        self.examTimeDist = Exponential(scale=_default(mean_exam_duration, D.MEAN_EXAM_DURATION))
+        self.probDepression = _default(prob_depression, D.PROB_DEPRESSION)
+        self.mentalHealthConsultDist = Exponential(scale=_default(mean_mh_consult, D.MEAN_MH_CONSULT))
+        self.pcpPatienceDist = None if mean_pcp_patience is None else Exponential(scale=mean_pcp_patience)
+        self.mhPatienceDist = None if mean_mh_patience is None else Exponential(scale=mean_mh_patience)
+        self.maxPCPQueue = _default(max_pcp_queue, D.MAX_PCP_QUEUE)
+        self.arrivalLog = _default(arrival_log, D.ARRIVAL_LOG)
+
+
+def _default(value, default):
+    """ :returns the value or the default value (read from InputData) if the value is not provided """
+    return default if value is _FROM_INPUT_DATA else value
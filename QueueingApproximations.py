@@ -0,0 +1,118 @@
+from deampy.statistics import SummaryStat
+
+import InputData as D
+from UrgentCareModel import MultiUrgentCareModel
+
+
+class QueueingApproximation:
+    def __init__(self, parameters):
+        """ closed-form estimates of the performance of the urgent care
+        (requires exponential inter-arrival and service times as in ModelParameters.Parameters).
+        The PCP stage is approximated as an M/M/c queue (Erlang C) and the MHP stage as an M/M/1 queue fed by
+        the flow leaving the PCP stage thinned with the probability of depression (the output of a
+        stable M/M/c queue is Poisson). These steady-state estimates apply when a stage is stable and
+        the urgent care opens long enough for the queues to settle. For an overloaded stage, the waiting time
+        is approximated by a fluid model of a queue that grows linearly while the urgent care is open.
+        :param parameters: parameters of the urgent care model
+        """
+
+        self.params = parameters
+
+        self.arrivalRate = 1 / parameters.arrivalTimeDist.scale
+        self.examRate = 1 / parameters.examTimeDist.scale
+        self.mhConsultRate = 1 / parameters.mentalHealthConsultDist.scale
+
+        # PCP stage
+        self.pcpUtilization = self.arrivalRate / (parameters.nPCPs * self.examRate)
+        self.ifPCPStable = self.pcpUtilization < 1
+        if self.ifPCPStable:
+            self.probWaitPCP = _erlang_c(n_servers=parameters.nPCPs, offered_load=self.arrivalRate / self.examRate)
+            self.aveWaitPCP = self.probWaitPCP / (parameters.nPCPs * self.examRate - self.arrivalRate)
+        else:
+            self.probWaitPCP = 1
+            self.aveWaitPCP = _fluid_ave_wait(arrival_rate=self.arrivalRate,
+                                              service_rate=parameters.nPCPs * self.examRate,
+                                              duration=parameters.hoursOpen)
+
+        # MHP stage (fed by the patients leaving the PCP stage with depression)
+        self.mhArrivalRate = parameters.probDepression * min(self.arrivalRate, parameters.nPCPs * self.examRate)
+        self.mhUtilization = self.mhArrivalRate / self.mhConsultRate
+        self.ifMHStable = self.mhUtilization < 1
+        if self.ifMHStable:
+            self.aveWaitMH = self.mhUtilization / (self.mhConsultRate - self.mhArrivalRate)
+        else:
+            self.aveWaitMH = _fluid_ave_wait(arrival_rate=self.mhArrivalRate,
+                                             service_rate=self.mhConsultRate,
+                                             duration=parameters.hoursOpen)
+
+        # time in system
+        self.aveTimeInSystem = self.aveWaitPCP + 1 / self.examRate \
+            + parameters.probDepression * (self.aveWaitMH + 1 / self.mhConsultRate)
+
+    def if_feasible(self, max_utilization=1):
+        """
+        :param max_utilization: maximum acceptable utilization of PCPs and MHP
+        :return: True if neither stage is loaded above the maximum utilization
+        """
+        return self.pcpUtilization < max_utilization and self.mhUtilization < max_utilization
+
+
+def validate_approximations(parameters_list, n_replications, sim_duration=D.SIM_DURATION, alpha=0.05):
+    """ compares the closed-form estimates with the simulated outputs
+    :param parameters_list: (list) of parameters of the urgent care model to validate at
+        (the steady-state estimates apply to configurations where both stages are stable)
+    :param n_replications: number of replications to simulate for each parameters
+    :param sim_duration: duration of simulation (hours)
+    :param alpha: significance level of the confidence intervals of the simulated outputs
+    :return: (list) of rows with the utilization of each stage, and the estimated and the simulated
+        (mean and confidence interval) average waiting times for PCP and MHP and time in system
+        (the first row is the header)
+    """
+
+    rows = [['PCP Utilization', 'MHP Utilization',
+             'Estimated PCP Wait', 'Simulated PCP Wait', 'CI of PCP Wait',
+             'Estimated MH Wait', 'Simulated MH Wait', 'CI of MH Wait',
+             'Estimated Time in System', 'Simulated Time in System', 'CI of Time in System']]
+
+    for parameters in parameters_list:
+        approx = QueueingApproximation(parameters=parameters)
+
+        multi_model = MultiUrgentCareModel(ids=range(n_replications), parameters=parameters)
+        multi_model.simulate(sim_duration=sim_duration)
+
+        row = [approx.pcpUtilization, approx.mhUtilization]
+        for estimate, obs in ((approx.aveWaitPCP, multi_model.aveWaitingTime),
+                              (approx.aveWaitMH, multi_model.aveMHWaitingTime),
+                              (approx.aveTimeInSystem, multi_model.aveTimeInSystem)):
+            stat = SummaryStat(data=obs)
+            row.extend([estimate, stat.get_mean(), stat.get_t_CI(alpha=alpha)])
+        rows.append(row)
+
+    return rows
+
+
+def _erlang_c(n_servers, offered_load):
+    """
+    :param n_servers: number of servers
+    :param offered_load: arrival rate / service rate (less than the number of servers)
+    :return: probability that an arriving customer waits in an M/M/c queue
+    """
+
+    # Erlang B by recursion (numerically stable for large number of servers)
+    erlang_b = 1
+    for k in range(1, n_servers + 1):
+        erlang_b = offered_load * erlang_b / (k + offered_load * erlang_b)
+
+    utilization = offered_load / n_servers
+    return erlang_b / (1 - utilization * (1 - erlang_b))
+
+
+def _fluid_ave_wait(arrival_rate, service_rate, duration):
+    """
+    :param arrival_rate: arrival rate while open
+    :param service_rate: total service rate (not more than the arrival rate)
+    :param duration: duration of the arrivals
+    :return: average waiting time of customers arriving during the duration if the queue grows
+        at rate arrival_rate - service_rate (a customer arriving at time t waits for the queue at time t to clear)
+    """
+    return (arrival_rate - service_rate) * duration / (2 * service_rate)
\ No newline at end of file
@@ -0,0 +1,210 @@
+import copy
+import math
+
+from deampy.statistics import SummaryStat
+
+import InputData as D
+from UrgentCareModel import UrgentCareModel
+
+
+class LikelihoodRatio:
+    # to accumulate the likelihood ratio of a simulation replication
+    # (the likelihood of the sampled values under the original distributions
+    # divided by their likelihood under the distributions they were sampled from)
+
+    def __init__(self):
+        self.logValue = 0
+        self.ifTilting = True   # set to False to sample from the original distributions
+        self.ifStopTilting = None   # function that returns True once tilting is no longer needed
+
+    def reset(self, if_stop_tilting=None):
+        """ resets the likelihood ratio to 1 before a new replication
+        :param if_stop_tilting: function (with no arguments) that returns True once the rest of
+            the replication should be sampled from the original distributions
+        """
+        self.logValue = 0
+        self.ifTilting = True
+        self.ifStopTilting = if_stop_tilting
+
+    def update_tilting(self):
+        """
+        :return: True if the next value should be sampled from the tilted distribution
+        """
+        if self.ifTilting and self.ifStopTilting is not None and self.ifStopTilting():
+            self.ifTilting = False
+        return self.ifTilting
+
+    def get_value(self):
+        """
+        :return: the likelihood ratio
+        """
+        return math.exp(self.logValue)
+
+
+class TiltedExponential:
+    def __init__(self, dist, scale_factor, likelihood_ratio):
+        """ samples from an exponential distribution with a scaled mean in place of
+        the original exponential distribution and updates the likelihood ratio
+        :param dist: the original exponential distribution (deampy.random_variates.Exponential)
+        :param scale_factor: (float) the scale of the original distribution is multiplied by this factor
+        :param likelihood_ratio: likelihood ratio of the replication
+        """
+
+        self.scale = dist.scale
+        self.loc = dist.loc
+        self.tiltedScale = dist.scale * scale_factor
+        self.likelihoodRatio = likelihood_ratio
+
+    def sample(self, rng, arg=None):
+        """
+        :param rng: random number generator
+        :return: a sample from the tilted distribution
+        """
+
+        # once the event has occurred, sample from the original distribution (likelihood ratio = 1)
+        if not self.likelihoodRatio.update_tilting():
+            return rng.exponential(scale=self.scale) + self.loc
+
+        x = rng.exponential(scale=self.tiltedScale)
+
+        # log of f(x)/g(x) where f is the original density and g is the tilted density
+        self.likelihoodRatio.logValue += \
+            math.log(self.tiltedScale / self.scale) + x / self.tiltedScale - x / self.scale
+
+        return x + self.loc
+
+
+class MHWaitExceeds:
+    def __init__(self, hours):
+        """ the event that a patient waits longer than the threshold to see the mental health specialist
+        :param hours: threshold on waiting time (hours)
+        """
+        self.hours = hours
+
+    def has_occurred(self, model):
+        """
+        :param model: urgent care model that is being simulated
+        :return: True if the event is known to occur at the current simulation time
+            (the patient at the front of the MH waiting room has already waited longer than the threshold)
+        """
+        patient = model.urgentCare.mhConsultWaitingRoom.get_longest_waiting_patient()
+        return patient is not None and model.simCal.time - patient.tJoinedMHWaitingRoom > self.hours
+
+    def __call__(self, sim_outputs):
+        """
+        :param sim_outputs: outputs of a simulation replication
+        :return: True if the event occurred in this replication
+        """
+        # patients who left the MH waiting room before being seen also count if they waited longer than the threshold
+        return max(max(sim_outputs.patientTimeInMHWaitingRoom, default=0),
+                   max(sim_outputs.patientTimeInMHWaitingRoomReneged, default=0)) > self.hours
+
+
+class PCPQueueExceeds:
+    def __init__(self, n_patients):
+        """ the event that the number of patients waiting to see a PCP exceeds the threshold
+        :param n_patients: threshold on the number of patients waiting
+        """
+        self.nPatients = n_patients
+
+    def has_occurred(self, model):
+        """
+        :param model: urgent care model that is being simulated
+        :return: True if the event is known to occur at the current simulation time
+        """
+        return model.simOutputs.nPatientsWaitingPCP.currentSize > self.nPatients
+
+    def __call__(self, sim_outputs):
+        """
+        :param sim_outputs: outputs of a simulation replication
+        :return: True if the event occurred in this replication
+        """
+        return sim_outputs.nPatientsWaitingPCP.stat.get_max() > self.nPatients
+
+
+class ImportanceSamplingEstimator:
+    def __init__(self, parameters, if_event, arrival_scale_factor=1, exam_scale_factor=1, mh_scale_factor=1):
+        """ estimates the probability of a rare event in a simulated day of the urgent care
+        by sampling inter-arrival and service times from exponential distributions with scaled means
+        (which makes the event more frequent) and weighting each replication by its likelihood ratio.
+        Once the event is known to occur, the rest of the replication is sampled from the original distributions.
+        The estimate is unbiased for any positive scale factors (all factors = 1 gives crude Monte Carlo), but
+        since every sample changes the likelihood ratio, factors close to 1 (e.g. 0.95 - 1.05) work best.
+        :param parameters: parameters of the urgent care model (with exponential distributions)
+        :param if_event: the rare event, e.g. MHWaitExceeds(hours=3) or PCPQueueExceeds(n_patients=40)
+            (returns True if the event occurred when called on the outputs of a replication,
+            and has_occurred(model) returns True once the event is known to occur during the simulation)
+        :param arrival_scale_factor: (float) factor to scale the mean inter-arrival time by (< 1 for more arrivals)
+        :param exam_scale_factor: (float) factor to scale the mean exam duration by (> 1 for longer exams)
+        :param mh_scale_factor: (float) factor to scale the mean MH consultation duration by
+        """
+
+        if parameters.arrivalLog is not None:
+            raise ValueError('Importance sampling is not available when arrivals are replayed from a log.')
+
+        self.params = parameters
+        self.ifEvent = if_event
+        self.likelihoodRatio = LikelihoodRatio()
+
+        # parameters with the tilted distributions
+        self.tiltedParams = copy.copy(parameters)
+        self.tiltedParams.arrivalTimeDist = TiltedExponential(
+            dist=parameters.arrivalTimeDist, scale_factor=arrival_scale_factor, likelihood_ratio=self.likelihoodRatio)
+        self.tiltedParams.examTimeDist = TiltedExponential(
+            dist=parameters.examTimeDist, scale_factor=exam_scale_factor, likelihood_ratio=self.likelihoodRatio)
+        self.tiltedParams.mentalHealthConsultDist = TiltedExponential(
+            dist=parameters.mentalHealthConsultDist, scale_factor=mh_scale_factor,
+            likelihood_ratio=self.likelihoodRatio)
+
+        self.nEventsObserved = 0    # number of replications in which the event occurred
+        self.observations = []      # likelihood ratio of each replication if the event occurred and 0 otherwise
+        self.statEstimate = None    # summary statistics of observations
+
+    def simulate(self, n_replications, sim_duration=D.SIM_DURATION, first_id=0):
+        """ simulates the replications
+        :param n_replications: number of replications
+        :param sim_duration: duration of each replication (hours)
+        :param first_id: ID of the first replication (replication IDs are used as random seeds)
+        """
+
+        for i in range(n_replications):
+            model = UrgentCareModel(id=first_id + i, parameters=self.tiltedParams)
+            self.likelihoodRatio.reset(if_stop_tilting=lambda: self.ifEvent.has_occurred(model=model))
+            model.simulate(sim_duration=sim_duration)
+
+            if self.ifEvent(model.simOutputs):
+                self.nEventsObserved += 1
+                self.observations.append(self.likelihoodRatio.get_value())
+            else:
+                self.observations.append(0)
+
+        self.statEstimate = SummaryStat(name='Probability of the rare event', data=self.observations)
+
+    def get_estimate(self):
+        """
+        :return: estimated probability of the event
+        """
+        return self.statEstimate.get_mean()
+
+    def get_st_err(self):
+        """
+        :return: standard error of the estimated probability
+        """
+        return self.statEstimate.get_stdev() / math.sqrt(len(self.observations))
+
+    def get_relative_error(self):
+        """
+        :return: relative error (standard error / estimate) of the estimated probability
+            (infinite if the event was never observed)
+        """
+        estimate = self.get_estimate()
+        if estimate == 0:
+            return math.inf
+        return self.get_st_err() / estimate
+
+    def get_CI(self, alpha=0.05):
+        """
+        :param alpha: significance level
+        :return: t-based confidence interval of the estimated probability
+        """
+        return self.statEstimate.get_t_CI(alpha=alpha)
\ No newline at end of file
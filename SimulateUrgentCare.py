@@ -1,77 +1,80 @@
-import deampy.plots.histogram as hist
-import deampy.plots.sample_paths as path
-
+import DecimatedPlots as Plot
 import InputData as D
 import ModelParameters as P
 import UrgentCareModel as M
 
-# create an urgent care model
-urgentCareModel = M.UrgentCareModel(id=1, parameters=P.Parameters())
-
-# simulate the urgent care
-urgentCareModel.simulate(sim_duration=D.SIM_DURATION)
-
-print('Total patients arrived:', urgentCareModel.urgentCare.simOutputs.nPatientsArrived)
-print('Total patients served:', urgentCareModel.urgentCare.simOutputs.nPatientsServed)
-print('Patients received mental health consultation', urgentCareModel.urgentCare.simOutputs.nPatientsReceivedMHConsult)
-
-print('Average patient time in system:', urgentCareModel.simOutputs.get_ave_patient_time_in_system())
-print('Average patient waiting time:', urgentCareModel.simOutputs.get_ave_patient_waiting_time())
-print('Average patient wait time for MHS:', urgentCareModel.simOutputs.get_ave_patient_mh_waiting_time())
-
-# sample path for patients in the system
-path.plot_sample_path(
-    sample_path=urgentCareModel.simOutputs.nPatientInSystem,
-    title='Patients In System',
-    x_label='Simulation time (hours)',
-)
+if __name__ == '__main__':
 
-# sample path for patients waiting to see a physician
-path.plot_sample_path(
-    sample_path=urgentCareModel.simOutputs.nPatientsWaitingPCP,
-    title='Patients Waiting to See a PCP',
-    x_label='Simulation time (hours)',
-)
+    # create an urgent care model
+    urgentCareModel = M.UrgentCareModel(id=1, parameters=P.Parameters())
 
-# sample path for patients waiting to see MHS
-path.plot_sample_path(
-    sample_path=urgentCareModel.simOutputs.nPatientsWaitingMH,
-    title='Patients Waiting to see MHS',
-    x_label='Simulation time (hours)',
-)
+    # simulate the urgent care
+    urgentCareModel.simulate(sim_duration=D.SIM_DURATION)
 
-# sample path for utilization of PCP
-path.plot_sample_path(
-    sample_path=urgentCareModel.simOutputs.nPCPBusy,
-    title='Utilization of PCP',
-    x_label='Simulation time (hours)'
-)
+    print('Total patients arrived:', urgentCareModel.urgentCare.simOutputs.nPatientsArrived)
+    print('Total patients served:', urgentCareModel.urgentCare.simOutputs.nPatientsServed)
+    print('Patients received mental health consultation', urgentCareModel.urgentCare.simOutputs.nPatientsReceivedMHConsult)
 
-# sample path for utilization of MHS
-path.plot_sample_path(
-    sample_path=urgentCareModel.simOutputs.nMHSBusy,
-    title='Utilization of MHS',
-    x_label='Simulation time (hours)'
-)
+    print('Average patient time in system:', urgentCareModel.simOutputs.get_ave_patient_time_in_system())
+    print('Average patient waiting time:', urgentCareModel.simOutputs.get_ave_patient_waiting_time())
+    print('Average patient wait time for MHS:', urgentCareModel.simOutputs.get_ave_patient_mh_waiting_time())
 
-hist.plot_histogram(
-    data=urgentCareModel.simOutputs.patientTimeInSystem,
-    title='Patients Time in System',
-    x_label='Hours',
-    #bin_width=.2
-)
-hist.plot_histogram(
-    data=urgentCareModel.simOutputs.patientTimeInPCPWaitingRoom,
-    title='Patients Time in PCP Waiting Room',
-    x_label='Hours',
-    #bin_width=0.2
-)
-hist.plot_histogram(
-    data=urgentCareModel.simOutputs.patientTimeInMHWaitingRoom,
-    title='Patients Time in MHS Waiting Room',
-    x_label='Hours',
-    #bin_width=0.2
-)
+    # figures are downsampled (or binned) here and rendered to files in parallel processes
+    Plot.render_figures(figures=[
+        # sample path for patients in the system
+        Plot.SamplePathFigure(
+            sample_path=urgentCareModel.simOutputs.nPatientInSystem,
+            title='Patients In System',
+            x_label='Simulation time (hours)',
+            file_name='Figures/Patients In System.png'
+        ),
+        # sample path for patients waiting to see a physician
+        Plot.SamplePathFigure(
+            sample_path=urgentCareModel.simOutputs.nPatientsWaitingPCP,
+            title='Patients Waiting to See a PCP',
+            x_label='Simulation time (hours)',
+            file_name='Figures/Patients Waiting to See a PCP.png'
+        ),
+        # sample path for patients waiting to see MHS
+        Plot.SamplePathFigure(
+            sample_path=urgentCareModel.simOutputs.nPatientsWaitingMH,
+            title='Patients Waiting to see MHS',
+            x_label='Simulation time (hours)',
+            file_name='Figures/Patients Waiting to see MHS.png'
+        ),
+        # sample path for utilization of PCP
+        Plot.SamplePathFigure(
+            sample_path=urgentCareModel.simOutputs.nPCPBusy,
+            title='Utilization of PCP',
+            x_label='Simulation time (hours)',
+            file_name='Figures/Utilization of PCP.png'
+        ),
+        # sample path for utilization of MHS
+        Plot.SamplePathFigure(
+            sample_path=urgentCareModel.simOutputs.nMHSBusy,
+            title='Utilization of MHS',
+            x_label='Simulation time (hours)',
+            file_name='Figures/Utilization of MHS.png'
+        ),
+        Plot.HistogramFigure(
+            data=urgentCareModel.simOutputs.patientTimeInSystem,
+            title='Patients Time in System',
+            x_label='Hours',
+            file_name='Figures/Patients Time in System.png'
+        ),
+        Plot.HistogramFigure(
+            data=urgentCareModel.simOutputs.patientTimeInPCPWaitingRoom,
+            title='Patients Time in PCP Waiting Room',
+            x_label='Hours',
+            file_name='Figures/Patients Time in PCP Waiting Room.png'
+        ),
+        Plot.HistogramFigure(
+            data=urgentCareModel.simOutputs.patientTimeInMHWaitingRoom,
+            title='Patients Time in MHS Waiting Room',
+            x_label='Hours',
+            file_name='Figures/Patients Time in MHS Waiting Room.png'
+        ),
+    ])
 
-# print trace
-urgentCareModel.print_trace()
\ No newline at end of file
+    # print trace
+    urgentCareModel.print_trace()
\ No newline at end of file
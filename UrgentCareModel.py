@@ -4,20 +4,24 @@ from deampy.in_out_functions import write_csv
 from deampy.support.simulation import DiscreteEventSimTrace
 
 import InputData as D
-from ModelEntities import UrgentCare, Patient
-from ModelEvents import CloseUrgentCare, Arrival
-from ModelOutputs import SimOutputs
+from ArrivalLog import ArrivalLog
+from ModelEntities import UrgentCare
+from ModelEvents import CloseUrgentCare, Renege
+from ModelOutputs import SimOutputs, TimeBucketStats
 
 
 class UrgentCareModel:
-    def __init__(self, id, parameters):
+    def __init__(self, id, parameters, arrival_log=None):
         """
         :param id: ID of this urgent care model
         :param parameters: parameters of this model
+        :param arrival_log: the arrival log (ArrivalLog) to replay the current day of
+            (None to replay the first day of parameters.arrivalLog if provided)
         """
 
         self.id = id
         self.params = parameters    # model parameters
+        self.arrivalLog = arrival_log
         self.simCal = None          # simulation calendar
         self.simOutputs = None      # simulation outputs
         self.trace = None           # simulation trace
@@ -36,11 +40,20 @@ class UrgentCareModel:
 
         # while there is an event scheduled in the simulation calendar
         # and the simulation time is less than the simulation duration
+        end_time = 0
         while self.simCal.n_events() > 0 and self.simCal.time <= sim_duration:
-            self.simCal.get_next_event().process(rng=rng)
+            event = self.simCal.get_next_event()
+            event.process(rng=rng)
+
+            # cancelled renege events are ignored and do not extend the simulation
+            if not (isinstance(event, Renege) and event.cancelled):
+                end_time = self.simCal.time
+
+        # release the arrival log (if arrivals were replayed)
+        self.urgentCare.close_arrival_log()
 
         # collect the end of simulation statistics
-        self.simOutputs.collect_end_of_simulation()
+        self.simOutputs.collect_end_of_simulation(time=end_time)
 
     def __initialize(self, rng):
         """ initialize the simulation model
@@ -64,7 +77,8 @@ class UrgentCareModel:
                                      parameters=self.params,
                                      sim_cal=self.simCal,
                                      sim_out=self.simOutputs,
-                                     trace=self.trace)
+                                     trace=self.trace,
+                                     arrival_log=self.arrivalLog)
 
         # schedule the closing event
         self.simCal.add_event(
@@ -72,20 +86,8 @@ class UrgentCareModel:
                                   urgent_care=self.urgentCare)
         )
 
-        # find the arrival time of the first patient
-        arrival_time = self.params.arrivalTimeDist.sample(rng=rng)
-
-        # find the depression status of the next patient
-        if_with_depression = False
-        if rng.random_sample() < self.params.probDepression:
-            if_with_depression = True
-
         # schedule the arrival of the first patient
-        self.simCal.add_event(
-            event=Arrival(time=arrival_time,
-                          patient=Patient(id=0, if_with_depression=if_with_depression),
-                          urgent_care=self.urgentCare)
-        )
+        self.urgentCare.schedule_next_arrival(patient_id=0, rng=rng)
 
     def print_trace(self):
         """ outputs trace """
@@ -98,4 +100,78 @@ class UrgentCareModel:
         write_csv(file_name='Patients-Replication' + str(self.id) + '.txt',
                   rows=self.simOutputs.patientSummary,
                   directory='Patients Summary',
-                  delete_existing_files=True)
\ No newline at end of file
+                  delete_existing_files=True)
+
+
+class MultiUrgentCareModel:
+    def __init__(self, ids, parameters):
+        """
+        :param ids: (list) IDs of the replications (also used as random seeds)
+        :param parameters: parameters of the urgent care model
+        """
+
+        self.ids = ids
+        self.params = parameters
+
+        self.aveTimeInSystem = []       # average patient time in system of each replication
+        self.aveWaitingTime = []        # average patient waiting time for PCP of each replication
+        self.aveMHWaitingTime = []      # average patient waiting time for MHS of each replication
+        self.bucketStats = TimeBucketStats()    # time-bucketed metrics merged across replications
+
+    def simulate(self, sim_duration):
+        """ simulate all replications
+        :param sim_duration: duration of simulation (hours)
+        """
+
+        for id in self.ids:
+            # create and simulate an urgent care model
+            model = UrgentCareModel(id=id, parameters=self.params)
+            model.simulate(sim_duration=sim_duration)
+
+            # collect the outputs of this replication
+            self.aveTimeInSystem.append(model.simOutputs.get_ave_patient_time_in_system())
+            self.aveWaitingTime.append(model.simOutputs.get_ave_patient_waiting_time())
+            self.aveMHWaitingTime.append(model.simOutputs.get_ave_patient_mh_waiting_time())
+            self.bucketStats.merge(model.simOutputs.bucketStats)
+
+
+class LoggedDaysUrgentCareModel:
+    def __init__(self, parameters, max_days=None):
+        """ replays the days of the arrival log (parameters.arrivalLog), each in a replication of the urgent care
+        model that opens at the opening hour of that day (the log is read once, one day at a time)
+        :param parameters: parameters of the urgent care model (with an arrival log)
+        :param max_days: maximum number of days to replay (None to replay all days of the log)
+        """
+
+        if parameters.arrivalLog is None:
+            raise ValueError('Days can be replayed only when the parameters have an arrival log.')
+
+        self.params = parameters
+        self.maxDays = max_days
+
+        self.days = []                  # days replayed (dates, or numbers of days if the log has hours)
+        self.aveTimeInSystem = []       # average patient time in system of each day
+        self.aveWaitingTime = []        # average patient waiting time for PCP of each day
+        self.aveMHWaitingTime = []      # average patient waiting time for MHS of each day
+        self.bucketStats = TimeBucketStats()    # time-bucketed metrics merged across days
+
+    def simulate(self, sim_duration):
+        """ simulate all days
+        :param sim_duration: duration of simulation of each day (hours)
+        """
+
+        log = ArrivalLog(file_name=self.params.arrivalLog)
+        try:
+            while (self.maxDays is None or len(self.days) < self.maxDays) and log.next_day():
+                # the number of the day is the random seed (of the values that are not in the log)
+                model = UrgentCareModel(id=len(self.days), parameters=self.params, arrival_log=log)
+                model.simulate(sim_duration=sim_duration)
+
+                # collect the outputs of this day
+                self.days.append(log.day)
+                self.aveTimeInSystem.append(model.simOutputs.get_ave_patient_time_in_system())
+                self.aveWaitingTime.append(model.simOutputs.get_ave_patient_waiting_time())
+                self.aveMHWaitingTime.append(model.simOutputs.get_ave_patient_mh_waiting_time())
+                self.bucketStats.merge(model.simOutputs.bucketStats)
+        finally:
+            log.close()
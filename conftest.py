@@ -0,0 +1,11 @@
+import pytest
+
+import InputData as D
+
+# (pytest adds the directory of this file, the root of the repository, to the path so the tests can import the model)
+
+
+@pytest.fixture(autouse=True)
+def no_trace(monkeypatch):
+    """ turns off the simulation trace in the tests (restored after each test) """
+    monkeypatch.setattr(D, 'TRACE_ON', False)
\ No newline at end of file
@@ -0,0 +1,69 @@
+import warnings
+from datetime import date
+
+import pytest
+
+import InputData as D
+from ModelParameters import Parameters
+from UrgentCareModel import LoggedDaysUrgentCareModel, UrgentCareModel
+
+
+def _write_log(path, rows):
+    """ writes an arrival log with the given rows (arrival time, exam duration) """
+    path.write_text('arrival_time,exam_duration,mh_duration,depression\n'
+                    + ''.join(time + ',' + str(exam) + ',,0\n' for time, exam in rows))
+    return str(path)
+
+
+def test_tied_timestamps(tmp_path):
+    # two exams start and end at exactly the same time with the same priority
+    params = Parameters(arrival_log=_write_log(tmp_path / 'log.csv', [('2024-01-01 08:00:00', 0.25),
+                                                                      ('2024-01-01 08:00:00', 0.25),
+                                                                      ('2024-01-01 08:30:00', 0.25)]))
+
+    model = UrgentCareModel(id=0, parameters=params)
+    model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert model.simOutputs.nPatientsServed == 3
+    assert model.simOutputs.patientTimeInSystem == [0.25, 0.25, 0.25]
+
+
+def test_replays_all_days(tmp_path):
+    # the visit at 1am belongs to the day that opened at 8am the day before
+    params = Parameters(arrival_log=_write_log(tmp_path / 'log.csv', [('2024-01-01 08:00:00', 0.25),
+                                                                      ('2024-01-02 09:00:00', 0.5),
+                                                                      ('2024-01-03 01:00:00', 0.5),
+                                                                      ('2024-01-04 10:00:00', 1)]))
+
+    multi_model = LoggedDaysUrgentCareModel(parameters=params)
+    multi_model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert multi_model.days == [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 4)]
+    assert multi_model.aveTimeInSystem == [0.25, 0.5, 1]
+    # each day opens at time 0, so the arrivals are counted in the hours since that day's opening
+    assert multi_model.bucketStats.nArrivals[:3] == [1, 1, 1]
+    assert multi_model.bucketStats.nArrivals[17] == 1
+
+
+def test_warns_when_days_are_not_replayed(tmp_path):
+    params = Parameters(arrival_log=_write_log(tmp_path / 'log.csv', [('2024-01-01 08:00:00', 0.25),
+                                                                      ('2024-01-02 08:00:00', 0.25)]))
+
+    model = UrgentCareModel(id=0, parameters=params)
+    with pytest.warns(UserWarning, match='Only the first day'):
+        model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert model.simOutputs.nPatientsServed == 1
+
+
+def test_no_warning_when_visits_after_closing_are_skipped(tmp_path):
+    # the visit at 7am the next day arrives after the urgent care closed (20 hours after opening)
+    params = Parameters(arrival_log=_write_log(tmp_path / 'log.csv', [('2024-01-01 08:00:00', 0.25),
+                                                                      ('2024-01-02 07:00:00', 0.25)]))
+
+    model = UrgentCareModel(id=0, parameters=params)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert model.simOutputs.nPatientsServed == 1
\ No newline at end of file
@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+import InputData as D
+from DistributedReplications import DistributedMultiUrgentCareModel, FileWorkQueue, WorkUnit, run_worker
+from ModelParameters import Parameters
+from UrgentCareModel import MultiUrgentCareModel
+
+
+class InlineWorkQueue(FileWorkQueue):
+    # a file work queue that simulates the pending work units whenever the coordinator checks for results
+    # (to test the coordinator without starting worker processes)
+
+    def get_results(self, unit_ids):
+        run_worker(queue=self, worker_id='test', if_stop_when_idle=True)
+        return FileWorkQueue.get_results(self, unit_ids=unit_ids)
+
+
+def _get_unit(id, parameters=None):
+    return WorkUnit(id=id, parameters=Parameters() if parameters is None else parameters,
+                    first_seed=0, n_seeds=1, sim_duration=D.SIM_DURATION)
+
+
+def test_same_outputs_as_multi_model(tmp_path):
+    queue = InlineWorkQueue(directory=str(tmp_path))
+    distributed = DistributedMultiUrgentCareModel(ids=range(4), parameters=Parameters(), queue=queue)
+    distributed.simulate(sim_duration=D.SIM_DURATION, unit_size=3, poll_interval=0)
+    multi_model = MultiUrgentCareModel(ids=range(4), parameters=Parameters())
+    multi_model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert distributed.aveTimeInSystem == multi_model.aveTimeInSystem
+    assert distributed.aveMHWaitingTime == multi_model.aveMHWaitingTime
+    assert distributed.bucketStats.nArrivals == multi_model.bucketStats.nArrivals
+    assert distributed.bucketStats.get_pcp_utilizations(n_pcps=D.N_PCP) \
+        == multi_model.bucketStats.get_pcp_utilizations(n_pcps=D.N_PCP)
+    # the files of the job are removed
+    for folder in (queue.pendingDir, queue.leasedDir, queue.resultsDir, queue.failuresDir):
+        assert os.listdir(folder) == []
+
+
+def test_lease_starts_when_leased(tmp_path):
+    queue = FileWorkQueue(directory=str(tmp_path), lease_time=60)
+    queue.put(_get_unit(id='unit'))
+    # the unit waited in the queue longer than the lease time
+    old = time.time() - 120
+    os.utime(os.path.join(queue.pendingDir, 'unit.pkl'), (old, old))
+
+    assert queue.lease(worker_id='test').id == 'unit'
+    assert queue.requeue_expired() == 0
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    queue = FileWorkQueue(directory=str(tmp_path), lease_time=0)
+    queue.put(_get_unit(id='unit'))
+    queue.lease(worker_id='test')
+
+    assert queue.lease(worker_id='test') is None
+    assert queue.requeue_expired() == 1
+    assert queue.lease(worker_id='test').id == 'unit'
+
+
+def test_failure_is_reported(tmp_path):
+    # a unit whose replications raise an error (the number of PCPs is not an integer)
+    queue = FileWorkQueue(directory=str(tmp_path))
+    queue.put(_get_unit(id='unit', parameters=Parameters(n_pcps='ten')))
+
+    assert run_worker(queue=queue, worker_id='test', if_stop_when_idle=True) == 0
+    failure = queue.get_failures(unit_ids=['unit'])['unit']
+    assert failure.attempt == 1 and failure.workerId == 'test' and 'TypeError' in failure.error
+    assert os.listdir(queue.leasedDir) == []
+
+
+def test_failing_unit_stops_after_max_attempts(tmp_path):
+    queue = InlineWorkQueue(directory=str(tmp_path))
+    distributed = DistributedMultiUrgentCareModel(ids=range(2), parameters=Parameters(n_pcps='ten'), queue=queue)
+
+    with pytest.raises(RuntimeError, match='failed 3 times'):
+        distributed.simulate(sim_duration=D.SIM_DURATION, poll_interval=0, max_attempts=3)
+    for folder in (queue.pendingDir, queue.leasedDir, queue.resultsDir, queue.failuresDir):
+        assert os.listdir(folder) == []
\ No newline at end of file
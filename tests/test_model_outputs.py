@@ -0,0 +1,14 @@
+import math
+
+import InputData as D
+from ModelParameters import Parameters
+from UrgentCareModel import MultiUrgentCareModel
+
+
+def test_no_patient_with_depression():
+    # no patient sees the MHS, so the MH waiting time is undefined (nan) instead of raising an error
+    multi_model = MultiUrgentCareModel(ids=range(2), parameters=Parameters(prob_depression=0))
+    multi_model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert all(math.isnan(wait) for wait in multi_model.aveMHWaitingTime)
+    assert all(not math.isnan(wait) for wait in multi_model.aveWaitingTime)
\ No newline at end of file
@@ -0,0 +1,12 @@
+import InputData as D
+from ModelParameters import Parameters
+
+
+def test_defaults_are_read_when_created(monkeypatch):
+    monkeypatch.setattr(D, 'N_PCP', 12)
+    monkeypatch.setattr(D, 'MEAN_PCP_PATIENCE', 0.5)
+
+    assert Parameters().nPCPs == 12
+    assert Parameters().pcpPatienceDist is not None
+    # None turns the feature off even when InputData turns it on
+    assert Parameters(mean_pcp_patience=None).pcpPatienceDist is None
\ No newline at end of file
@@ -0,0 +1,73 @@
+from deampy.discrete_event_sim import SimulationCalendar
+from deampy.support.simulation import DiscreteEventSimTrace
+
+import InputData as D
+from ModelEntities import Patient, PCPWaitingRoom
+from ModelOutputs import SimOutputs
+from ModelParameters import Parameters
+from RareEventEstimation import MHWaitExceeds
+from UrgentCareModel import UrgentCareModel
+
+
+def test_renege_cancelled_when_service_starts(tmp_path):
+    # one PCP and two patients at opening: the second patient starts the exam long before running out of patience
+    log = tmp_path / 'log.csv'
+    log.write_text('arrival_time,exam_duration,mh_duration,depression\n'
+                   '2024-01-01 08:00:00,0.25,,0\n'
+                   '2024-01-01 08:00:00,0.25,,0\n')
+    model = UrgentCareModel(id=0, parameters=Parameters(hours_open=4, n_pcps=1, mean_pcp_patience=1000,
+                                                        arrival_log=str(log)))
+    model.simulate(sim_duration=D.SIM_DURATION)
+
+    assert model.simOutputs.nPatientsServed == 2
+    assert model.simOutputs.nPatientsRenegedPCP == 0
+    assert model.simOutputs.patientTimeInPCPWaitingRoom == [0, 0.25]
+    # the cancelled renege event is skipped and does not extend the run past the closing
+    assert model.simCal.n_events() == 0
+    assert sum(model.simOutputs.bucketStats.observedTime) == 4
+
+
+def test_remove_patient_from_middle_of_queue():
+    sim_cal = SimulationCalendar()
+    sim_out = SimOutputs(sim_cal=sim_cal)
+    waiting_room = PCPWaitingRoom(sim_out=sim_out,
+                                  trace=DiscreteEventSimTrace(sim_calendar=sim_cal, if_should_trace=False,
+                                                                    deci=D.DECI))
+    patients = [Patient(id=i, if_with_depression=False) for i in range(3)]
+    for patient in patients:
+        patient.tArrived = 0
+        waiting_room.add_patient(patient=patient)
+
+    waiting_room.remove_patient(patient=patients[1])
+
+    assert waiting_room.get_num_patients_waiting() == 2
+    assert waiting_room.get_next_patient() is patients[0]
+    assert waiting_room.get_next_patient() is patients[2]
+    assert sim_out.nPatientsRenegedPCP == 1
+
+
+def test_patients_are_conserved():
+    # patients arrive faster than they are served, so some balk and some run out of patience
+    model = UrgentCareModel(id=1, parameters=Parameters(mean_arrival_time=1/80, mean_pcp_patience=0.5,
+                                                        mean_mh_patience=1, max_pcp_queue=20))
+    model.simulate(sim_duration=D.SIM_DURATION)
+    outputs = model.simOutputs
+
+    assert outputs.nPatientsBalked > 0 and outputs.nPatientsRenegedPCP > 0 and outputs.nPatientsRenegedMH > 0
+    assert outputs.nPatientsArrived == outputs.nPatientsServed + outputs.nPatientsBalked \
+        + outputs.nPatientsRenegedPCP + outputs.nPatientsRenegedMH
+    assert sum(outputs.bucketStats.nArrivals) == outputs.nPatientsArrived
+    assert model.urgentCare.waitingRoom.get_num_patients_waiting() == 0
+    assert model.urgentCare.mhConsultWaitingRoom.get_num_patients_waiting() == 0
+    assert outputs.nPatientInSystem.currentSize == 0
+
+
+
+def test_rare_event_includes_reneged_patients():
+    # a patient who waits longer than the threshold and then leaves the MH waiting room
+    outputs = SimOutputs(sim_cal=SimulationCalendar())
+    outputs.patientTimeInMHWaitingRoom = [0.5]
+    outputs.patientTimeInMHWaitingRoomReneged = [2]
+
+    assert MHWaitExceeds(hours=1)(outputs)
+    assert not MHWaitExceeds(hours=3)(outputs)
\ No newline at end of file
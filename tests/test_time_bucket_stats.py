@@ -0,0 +1,48 @@
+import math
+
+import InputData as D
+from ModelParameters import Parameters
+from UrgentCareModel import UrgentCareModel
+
+
+def test_known_run(tmp_path):
+    # one PCP, a patient every half an hour for 4 hours, and 15-minute exams: 2 arrivals per hour,
+    # the PCP is busy half of the time, and no patient waits
+    log = tmp_path / 'log.csv'
+    log.write_text('arrival_time,exam_duration,mh_duration,depression\n'
+                   + ''.join('2024-01-01 %02d:%02d:00,0.25,,0\n' % (8 + i // 2, 30 * (i % 2)) for i in range(8)))
+    model = UrgentCareModel(id=0, parameters=Parameters(hours_open=4, n_pcps=1, arrival_log=str(log)))
+    model.simulate(sim_duration=D.SIM_DURATION)
+    stats = model.simOutputs.bucketStats
+
+    # the run ends when the urgent care closes (after the last exam)
+    assert stats.get_n_buckets() == 4
+    assert math.isclose(sum(stats.observedTime), 4)
+    assert stats.nArrivals == [2, 2, 2, 2]
+    for bucket in range(4):
+        assert math.isclose(stats.get_arrival_rates()[bucket], 2)
+        assert math.isclose(stats.get_departure_rates()[bucket], 2)
+        assert math.isclose(stats.get_pcp_utilizations(n_pcps=1)[bucket], 0.5)
+        assert stats.get_wait_percentiles(percentile=90)[bucket] < D.WAIT_BIN_WIDTH
+
+    # by hour of day, the first hour after opening at 8am is bucket 8
+    folded = stats.fold(period=24, clock_offset=8)
+    assert folded.nArrivals == [0] * 8 + [2, 2, 2, 2] + [0] * 12
+    assert math.isclose(folded.get_pcp_utilizations(n_pcps=1)[8], 0.5)
+
+
+def test_saturated_run():
+    # patients arrive at 60 per hour and 10 PCPs serve at most 60 per hour,
+    # so the PCPs are busy all the time while the urgent care is open
+    model = UrgentCareModel(id=1, parameters=Parameters())
+    model.simulate(sim_duration=D.SIM_DURATION)
+    stats = model.simOutputs.bucketStats
+
+    # the buckets cover the whole run (past 24 hours) without folding
+    assert stats.get_n_buckets() > 24
+    assert math.isclose(sum(stats.observedTime), stats.tLastUpdated)
+    assert sum(stats.nArrivals) == model.simOutputs.nPatientsArrived
+
+    arrival_rates = stats.get_arrival_rates()[:D.HOURS_OPEN]
+    assert 50 < sum(arrival_rates) / len(arrival_rates) < 70
+    assert min(stats.get_pcp_utilizations(n_pcps=D.N_PCP)[4:D.HOURS_OPEN]) > 0.95
\ No newline at end of file